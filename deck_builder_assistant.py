@@ -33,18 +33,35 @@ import os
 import sys
 import json
 import re
+import pickle
+import subprocess
+import gzip
+import bz2
+import lzma
+import sqlite3
+import hashlib
 # import csv
 from argparse import ArgumentParser
-from urllib.request import urlopen,urlretrieve
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+from urllib.error import HTTPError
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from io import BytesIO
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from array import array
+from types import MappingProxyType
+from threading import Lock, get_ident
 from pathlib import Path
 from math import comb, prod
 from datetime import datetime
-from time import monotonic_ns, sleep
+from time import monotonic_ns, time_ns, sleep
 from os.path import join as pjoin
 from textwrap import wrap
 # import pprint
 USE_NX = False
 USE_SIXEL = False
+USE_ZSTD = False
 try:
     import networkx as nx
     USE_NX = True
@@ -55,6 +72,11 @@ try:
     USE_SIXEL = True
 except ImportError:
     pass
+try:
+    import zstandard
+    USE_ZSTD = True
+except ImportError:
+    pass
 try:
     from termcolor import colored
 except ImportError:
@@ -195,19 +217,181 @@ FILL_GRAVEYARD_FAST = False
 
 TERM_COLS, TERM_LINES = os.getenv('TERM_COLS', None), os.getenv('TERM_LINES', None)
 
+# local cache: one sub-directory (namespace) per kind of files, the least recently used files
+# being evicted when the cache total size is above the budget.
+# It is private to the user (see 'make_cache_dir()'), since the snapshots are unpickled from it.
+CACHE_DIR = os.getenv('DECK_BUILDER_ASSISTANT_CACHE_DIR',
+                      pjoin(os.getenv('XDG_CACHE_HOME') or pjoin(os.path.expanduser('~'), '.cache'),
+                            'deck-builder-assistant'))
+CACHE_NAMESPACES = ['scryfall', 'commanderspellbook', 'xmage', 'images', 'exports']
+CACHE_MAX_BYTES = 1024 * 1024 * 1024
+CACHE_FILES_IN_USE = set([])
+# suffixes of the files kept next to a cached data file (HTTP validators, sync state, checkpoint,
+# snapshot, tags, effects index and SQLite database), evicted with it (see 'get_cache_group()')
+CACHE_SIDECAR_SUFFIX_REGEX = (r'(\.(meta|checkpoint|effects)\.json|\.tags\.pickle|\.pickle|\.sqlite'
+                              r'|\.json(\.\w+)?)$')
+
+# codecs to store the cards and combos databases: name -> (file extension, file opener)
+STORAGE_CODECS = {
+    'none': ('', open),
+    'gzip': ('.gz', gzip.open),
+    'bz2': ('.bz2', bz2.open),
+    'xz': ('.xz', lzma.open),
+}
+if USE_ZSTD:
+    STORAGE_CODECS['zstd'] = ('.zst', zstandard.open)
+# 'auto' selects the available codec with the fastest decompression
+STORAGE_CODEC = os.getenv('DECK_BUILDER_ASSISTANT_STORAGE_CODEC', 'auto')
+
 SCRYFALL_API_BULK_URL = 'https://api.scryfall.com/bulk-data'
-LAST_SCRYFALL_CALL_TS_N = 0
+
+# token bucket rate limiters: name -> (requests per second, burst)
+RATE_LIMITS = {
+    'scryfall': (10, 1),  # Scryfall asks for 50-100 milliseconds between requests
+    'commanderspellbook': (4, 4),
+}
+RATE_LIMITERS_STATE = {}
+RATE_LIMITERS_LOCK = Lock()
+
+# HTTP client: persistent connections pooled by host, and compressed transfers
+HTTP_HEADERS = {
+    'User-Agent': 'MTG-deck-builder-assistant/1.0',
+    'Accept': 'application/json;q=0.9,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+}
+HTTP_TIMEOUT = 60
+HTTP_CHUNK_SIZE = 1024 * 1024
+HTTP_CONNECTIONS_POOL = {}
+HTTP_CONNECTIONS_LOCK = Lock()
+
+# number of cards' images downloaded at the same time
+IMAGES_PREFETCH_WORKERS = 4
+# when set, the HTML output shows the cards' images from that local directory instead of their
+# Scryfall URLs (see 'get_card_html_image_url()'), the cards shown being recorded in
+# 'HTML_IMAGES_CARDS' (card name -> card) to download their images at the end of the run
+HTML_IMAGES_DIR = None
+HTML_IMAGES_CARDS = {}
+
+# the only Scryfall card fields that are kept when loading the cards database
+# (a field name mapped to a list is a sub-object projected to those keys)
+SCRYFALL_CARD_FIELDS = {
+    'oracle_id': None,
+    'name': None,
+    'oracle_text': None,
+    'card_faces': None,
+    'type_line': None,
+    'mana_cost': None,
+    'cmc': None,
+    'colors': None,
+    'color_identity': None,
+    'produced_mana': None,
+    'keywords': None,
+    'legalities': ['commander'],
+    'prices': ['usd', 'eur'],
+    'rarity': None,
+    'set': None,
+    'edhrec_rank': None,
+    'power': None,
+    'toughness': None,
+    'image_uris': None,
+}
+SCRYFALL_CARD_FACE_FIELDS = ['name', 'oracle_text', 'type_line', 'mana_cost', 'cmc', 'colors',
+                             'keywords', 'power', 'toughness', 'image_uris']
+# bump it when the snapshot content changes (i.e.: the fields above), the stripped texts being
+# checked by their own hash (see 'get_stripped_oracle_texts_hash()')
+SCRYFALL_CARDS_SNAPSHOT_VERSION = 4
 
 COMMANDERSPELLBOOK_COMBOS_API_URL = 'https://backend.commanderspellbook.com/variants/?format=json'
+# save the crawl progress every that number of pages
+COMMANDERSPELLBOOK_CHECKPOINT_PAGES = 20
+# number of pages fetched at the same time
+COMMANDERSPELLBOOK_CONCURRENCY = 4
+# SQLite combos database (see 'get_commanderspellbook_combos_db()')
+COMMANDERSPELLBOOK_COMBOS_DB_SCHEMA = """
+CREATE TABLE effects (id INTEGER PRIMARY KEY, effect TEXT);
+CREATE TABLE card_names (id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE combos (id TEXT PRIMARY KEY, effect_id INTEGER, cards_count INTEGER) WITHOUT ROWID;
+CREATE TABLE combo_cards (combo_id TEXT, position INTEGER, name_id INTEGER,
+                          PRIMARY KEY (combo_id, position)) WITHOUT ROWID;
+"""
+COMMANDERSPELLBOOK_COMBOS_DB_INDEXES = """
+CREATE UNIQUE INDEX card_names_name ON card_names (name);
+CREATE INDEX combos_cards_count ON combos (cards_count);
+CREATE INDEX combos_effect_id ON combos (effect_id);
+CREATE INDEX combo_cards_name ON combo_cards (name_id, combo_id);
+"""
+# bump it when the schema above changes, so the databases are built again
+COMMANDERSPELLBOOK_COMBOS_DB_VERSION = 2
 
 XMAGE_COMMANDER_BANNED_LIST_URL = 'https://github.com/magefree/mage/raw/master/Mage.Server.Plugins/Mage.Deck.Constructed/src/mage/deck/Commander.java'
 XMAGE_DUELCOMMANDER_BANNED_LIST_URL = 'https://github.com/magefree/mage/raw/master/Mage.Server.Plugins/Mage.Deck.Constructed/src/mage/deck/DuelCommander.java'
 XMAGE_BANNED_LINE_REGEX = r'^\s*banned(Commander)?\.add\("(?P<name>[^"]+)"\);\s*$'
-XMAGE_COMMANDER_BANNED_LIST_FILE = "/tmp/xmage-Commander-banned-list.txt"
-XMAGE_DUELCOMMANDER_BANNED_LIST_FILE = "/tmp/xmage-DuelCommander-banned-list.txt"
+XMAGE_COMMANDER_BANNED_LIST_FILE = "xmage-Commander-banned-list.txt"
+XMAGE_DUELCOMMANDER_BANNED_LIST_FILE = "xmage-DuelCommander-banned-list.txt"
 XMAGE_COMMANDER_CARDS_BANNED = []
 
+# cards lists indexes by name (see 'get_cards_index()'): id of the list -> index
+CARDS_INDEXES = {}
+# number of cards lists indexes kept
+CARDS_INDEXES_MAX = 8
+# texts derived from the cards oracle texts (see 'get_card_texts()'): id of the card ->
+# tuple(card, texts)
+CARDS_TEXTS = {}
+# reminder texts removed from the oracle texts by the matchers, because they would be taken for
+# effects (see 'get_stripped_oracle_texts()'), the other ones are kept since some effects are
+# only described by them (e.g.: Treasure, Clue)
+ORACLE_TEXT_REMINDER_TEXTS = [
+    '(Then exile this card. You may cast the creature later from exile.)',
+    '(Then exile this card. You may cast the artifact later from exile.)',
+    "(Effects that say \"destroy\" don't destroy this artifact.)",
+    "(Damage and effects that say \"destroy\" don't destroy them.)",
+    "(Damage and effects that say \"destroy\" don't destroy it.)",
+    '(Any amount of damage it deals to a creature is enough to destroy it.)',
+    '(You may cast this spell for its cleave cost. If you do, remove the words in square '
+    'brackets.)',
+    '(If you discard this card, discard it into exile. When you do, cast it for its madness cost '
+    'or put it into your graveyard.)',
+    '(You may cast this card from your graveyard for its flashback cost. Then exile it.)',
+    '(You may cast this card from your graveyard for its flashback cost and any additional '
+    'costs. Then exile it.)',
+    "(This creature can't attack.)",
+    "(Create a token that's a copy of a creature token you control.)",
+]
+ORACLE_TEXT_REMINDER_REGEX = '|'.join(map(re.escape, ORACLE_TEXT_REMINDER_TEXTS))
+# self-references removed from the oracle texts by the matchers, so they are not taken for
+# effects on other cards ('<name>' is replaced by the card's and faces names)
+ORACLE_TEXT_SELF_REFERENCES_REGEXES = [
+    'Exile this Saga, then return it to the battlefield transformed',
+    r'If <name> would be put into a graveyard from anywhere, exile it instead\.',
+    'Exile <name>',
+    'destroy <name>',
+    "[Rr]eturn <name> to its owner's hand",
+    '<name> becomes a Shapeshifter artifact creature with base power and toughness',
+]
+# categories tags of the cards (see 'get_card_tags()'): id of the card -> tuple(card, tags)
+CARDS_TAGS = {}
+# bump it when the tagging code changes (i.e.: how 'get_card_tags()' evaluates the rules or what
+# 'get_card_texts()' returns), so the saved cards tags are computed again
+CARDS_TAGS_FORMAT_VERSION = 1
+# number of cards names listed by tag when reporting the tags changes
+# (see 'print_cards_tags_changes()')
+CARDS_TAGS_CHANGES_MAX_NAMES = 20
+# compiled regexes registry (see 'get_regex()'): pattern -> compiled regex
+REGEXES = {}
+# search statistics of the compiled regexes (see 'regex_search()'):
+# pattern -> list(searches, hits, nanoseconds)
+REGEXES_STATS = {}
+# the regexes above compiled once, '<name>' matching the names markers
+# (see 'get_stripped_oracle_texts()')
+ORACLE_TEXT_SELF_REFERENCES_REGEX = re.compile('|'.join(
+    map(lambda r: r.replace('<name>', '\x00\\d+\x01'), ORACLE_TEXT_SELF_REFERENCES_REGEXES)))
+
+DATA_REFRESH_LOCK_FILE = pjoin(CACHE_DIR, "refresh.lock")
+DATA_REFRESH_LOG_FILE = pjoin(CACHE_DIR, "refresh.log")
+
 ALL_COLORS = set(['R', 'G', 'U', 'B', 'W'])
+# color identity as a 5 bits mask (see 'get_color_identity_mask()')
+COLORS_BITS = {'W': 1, 'U': 2, 'B': 4, 'R': 8, 'G': 16}
 COLOR_NAME = {
     'B': 'dark_grey',
     'U': 'light_blue',
@@ -338,6 +522,12 @@ COPY_CARDS_EXCLUDE_REGEX = r'('+('|'.join([
     'when you cast this spell, copy it',
     "exile this card from your graveyard: create a token that's a copy of it",
 ]))+')'
+# texts removed from the (stripped and lowercased) oracle texts before matching copy cards
+COPY_CARDS_IGNORED_REGEX = r'('+('|'.join([
+    'its controller may cast a copy of the encoded card without paying its mana cost',
+    'copy it and you may choose a new target for the copy',
+    "create a token that's a copy of this creature that's tapped and attacking that player",
+]))+')'
 
 COUNTERSPELL_CARDS_REGEX = {
     'non specific target, no condition': [
@@ -757,6 +947,45 @@ NO_PAY_CARDS_EXCLUDE_REGEX = r'('+('|'.join([
     'cipher.*its controller may cast a copy of the encoded card without paying its mana cost',
 ]))+')'
 
+# categories rules evaluated in a single pass over each card (see 'get_card_tags()'), each one
+# being a tuple(category, regexes, exclude regex, texts key, ignored regex) where:
+#   regexes         either a list (tag: '<category>') or a dict of lists by feature
+#                   (tags: '<category>' and '<category>/<feature>')
+#   texts key       the card's texts matched (see 'get_card_texts()'), or a tuple(texts key,
+#                   exclude texts key) when the exclude regex is matched against other texts
+#   ignored regex   texts removed before matching (or None)
+# NOTE: the commander dependent filters (land types, lands) are applied by the assists
+CARDS_TAGS_RULES = [
+    ('ramp', RAMP_CARDS_REGEX_BY_FEATURES, RAMP_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+    ('no-pay', NO_PAY_CARDS_REGEX, NO_PAY_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+    ('draw', DRAW_CARDS_REGEX, DRAW_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+    ('tutor', TUTOR_CARDS_REGEX, TUTOR_CARDS_EXCLUDE_REGEX, 'lower', None),
+    ('tutor', TUTOR_CARDS_JOIN_TEXTS_REGEX, TUTOR_CARDS_EXCLUDE_REGEX,
+     ('joined_lower', 'lower'), None),
+    ('removal', REMOVAL_CARDS_REGEX, REMOVAL_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+    ('disabling', DISABLING_CARDS_REGEX, DISABLING_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+    ('wipe', WIPE_CARDS_REGEX, WIPE_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+    ('graveyard-recursion', GRAVEYARD_RECURSION_CARDS_REGEX,
+     GRAVEYARD_RECURSION_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+    ('graveyard-hate', GRAVEYARD_HATE_CARDS_REGEX, GRAVEYARD_HATE_CARDS_EXCLUDE_REGEX,
+     'stripped_lower', None),
+    ('copy', COPY_CARDS_REGEX, COPY_CARDS_EXCLUDE_REGEX, 'stripped_lower',
+     COPY_CARDS_IGNORED_REGEX),
+    ('counterspell', COUNTERSPELL_CARDS_REGEX, COUNTERSPELL_CARDS_EXCLUDE_REGEX,
+     'stripped_lower', None),
+    ('cannot-be-countered', CANNOTBECOUNTERED_CARDS_REGEX, CANNOTBECOUNTERED_CARDS_EXCLUDE_REGEX,
+     'stripped_lower', None),
+    ('cannot-attack', CANNOTATTACK_CARDS_REGEX, CANNOTATTACK_CARDS_EXCLUDE_REGEX,
+     'stripped_lower', None),
+    ('cannot-cast-spell', CANNOTCASTSPELL_CARDS_REGEX, CANNOTCASTSPELL_CARDS_EXCLUDE_REGEX,
+     'stripped_lower', None),
+    ('prevent-damage', PREVENTDAMAGE_CARDS_REGEX, PREVENTDAMAGE_CARDS_EXCLUDE_REGEX,
+     'stripped_lower', None),
+    ('gain-control', GAINCONTROL_CARDS_REGEX, GAINCONTROL_CARDS_EXCLUDE_REGEX,
+     'stripped_lower', None),
+    ('protect', PROTECT_CARDS_REGEX, PROTECT_CARDS_EXCLUDE_REGEX, 'stripped_lower', None),
+]
+
 CREATURE_MALUS_REGEXES = [
     "As an additional cost to cast this spell, (exile|sacrifice|tap|reveal|discard)",
     "When <name> enters the battlefield, (sacrifice (it|a)|(exile|return) (it|[^.]+ you control))",
@@ -1003,96 +1232,519 @@ def get_sources_requirements(item):
             return 26
     raise Exception("Not implemented")  # pylint: disable=broad-exception-raised
 
-def get_scryfall_bulk_data(outdir = '/tmp', update = False):
-    """Download Scryfull bulk data informations.
+def http_get_connection(scheme, netloc, fresh = False):
+    """Return an idle pooled connection to that host, or a new one (always if 'fresh' is 'True'),
+       and whether it was pooled"""
+    with HTTP_CONNECTIONS_LOCK:
+        if not fresh and HTTP_CONNECTIONS_POOL.get((scheme, netloc)):
+            return HTTP_CONNECTIONS_POOL[(scheme, netloc)].pop(), True
+    if scheme == 'https':
+        return HTTPSConnection(netloc, timeout = HTTP_TIMEOUT), False
+    return HTTPConnection(netloc, timeout = HTTP_TIMEOUT), False
+
+def http_release_connection(scheme, netloc, conn, response):
+    """Put back the connection in the pool of idle connections to that host, once its response
+       has been fully read (or close it if the server doesn't keep it alive)"""
+    if response.will_close:
+        conn.close()
+        return
+    with HTTP_CONNECTIONS_LOCK:
+        if (scheme, netloc) not in HTTP_CONNECTIONS_POOL:
+            HTTP_CONNECTIONS_POOL[(scheme, netloc)] = []
+        HTTP_CONNECTIONS_POOL[(scheme, netloc)].append(conn)
+
+def http_get(url, headers = None, file_path = None, file_codec = 'none', max_redirects = 5):
+    """Do an HTTP GET request through a pool of persistent connections (one pool per host), and
+       return a tuple (status, response headers, body).
 
-       Scryfall recommends to not download it more than once a week, so the filename
-       after downloading it to disk would contain the week number in order to prevent
-       other downloads the same week.
+       The body is decoded from gzip/deflate transfer encoding. If 'file_path' is specified, the
+       body is streamed to that file instead, and 'None' is returned as body.
+       Redirections are followed, and an 'urllib.error.HTTPError' is raised for error status.
+       A '304 Not Modified' status is returned as is (with an empty body).
 
        Options:
 
-       outdir      string   The directory where the image is going to be downloaded
-       update       bool    If 'True' force updating the image on local store
+       headers        dict    Additional request headers
+       file_path     string   Download the body to that file
+       file_codec    string   Compress the downloaded file with that codec (see 'STORAGE_CODECS')
+       max_redirects   int    Maximum number of redirections to follow
     """
+    request_headers = HTTP_HEADERS | (headers or {})
+    for _ in range(max_redirects + 1):
+        url_parts = urlsplit(url)
+        path = url_parts.path or '/'
+        if url_parts.query:
+            path += '?'+url_parts.query
+        for retry in range(2):
+            # the retry uses a new connection, since the other pooled ones may be stale too
+            conn, reused = http_get_connection(url_parts.scheme, url_parts.netloc,
+                                               fresh = bool(retry))
+            try:
+                conn.request('GET', path, headers = request_headers)
+                response = conn.getresponse()
+                break
+            except (HTTPException, OSError):
+                conn.close()
+                # a pooled connection may have been closed by the server in the meantime
+                if not reused or retry:
+                    raise
+
+        try:
+            if response.status in [301, 302, 303, 307, 308] and response.getheader('Location'):
+                response.read()
+                http_release_connection(url_parts.scheme, url_parts.netloc, conn, response)
+                url = urljoin(url, response.getheader('Location'))
+                continue
 
-    date_text = datetime.utcnow().strftime('%Y-%W')
-    bulk_data_file_name = 'scryfall-bulk-data-'+date_text+'.json'
-    bulk_data_file_path = pjoin(outdir, bulk_data_file_name)
-    bulk_data_file_ref = Path(bulk_data_file_path)
+            if response.status >= 400:
+                body = response.read()
+                raise HTTPError(url, response.status, response.reason, response.headers,
+                                BytesIO(body))
+
+            encoding = (response.getheader('Content-Encoding') or '').lower()
+            decompressor = None
+            if encoding == 'gzip':
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            elif encoding == 'deflate':
+                decompressor = zlib.decompressobj()
+
+            body = None
+            if file_path and response.status == 200:
+                with open_storage_file(file_path, 'wb', file_codec) as f_write:
+                    while chunk := response.read(HTTP_CHUNK_SIZE):
+                        f_write.write(decompressor.decompress(chunk) if decompressor else chunk)
+                    if decompressor:
+                        f_write.write(decompressor.flush())
+            else:
+                body = response.read()
+                if decompressor:
+                    body = decompressor.decompress(body) + decompressor.flush()
+        except BaseException:
+            conn.close()
+            raise
+
+        http_release_connection(url_parts.scheme, url_parts.netloc, conn, response)
+        return response.status, response.headers, body
+
+    raise HTTPError(url, 310, 'Too many redirections', None, None)
+
+def save_json_file_atomically(data, file_path, codec = None):
+    """Write the data as JSON to a temporary file, then rename it to the file path.
+       The file is compressed with the codec specified (guessed from its extension by default)."""
+    file_path_tmp = file_path+'.'+str(os.getpid())+'.tmp'
+    with open_storage_file(file_path_tmp, 'wt',
+                           codec or get_storage_codec_from_path(file_path)) as f_write:
+        json.dump(data, f_write)
+    os.replace(file_path_tmp, file_path)
+
+def make_cache_dir():
+    """Create the cache directory if needed (only accessible by the current user), and ensure
+       it is owned by the current user and not writable by the others, since the cards snapshot
+       and tags are unpickled from it (raise a 'PermissionError' otherwise)"""
+    os.makedirs(CACHE_DIR, mode = 0o700, exist_ok = True)
+    cache_dir_stat = os.stat(CACHE_DIR)
+    if ((hasattr(os, 'getuid') and cache_dir_stat.st_uid != os.getuid())
+            or cache_dir_stat.st_mode & 0o022):
+        raise PermissionError("cache directory '"+CACHE_DIR+"' is not owned by the current user "
+                              "or is writable by the others")
+
+def get_cache_dir(namespace):
+    """Return the path of the cache directory of that namespace (see 'CACHE_NAMESPACES'),
+       creating it if needed (see 'make_cache_dir()')"""
+    make_cache_dir()
+    cache_dir = pjoin(CACHE_DIR, namespace)
+    os.makedirs(cache_dir, mode = 0o700, exist_ok = True)
+    return cache_dir
+
+def cache_touch(file_path):
+    """Record an access to that cached file (its access time), keeping its modification time,
+       and protect it from eviction for the current run"""
+    if Path(file_path).is_file():
+        os.utime(file_path, ns = (time_ns(), os.stat(file_path).st_mtime_ns))
+        CACHE_FILES_IN_USE.add(os.path.abspath(file_path))
+
+def get_cache_files():
+    """Return a list of tuple (namespace, path, size in bytes, last access time) of every file
+       in the cache"""
+    cache_files = []
+    for namespace in CACHE_NAMESPACES:
+        cache_dir = Path(CACHE_DIR, namespace)
+        if not cache_dir.is_dir():
+            continue
+        for file_ref in cache_dir.rglob('*'):
+            try:
+                if file_ref.is_file():
+                    file_stat = file_ref.stat()
+                    cache_files.append((namespace, str(file_ref), file_stat.st_size,
+                                        file_stat.st_atime))
+            except FileNotFoundError:  # removed meanwhile by a concurrent run
+                pass
+    return cache_files
+
+def get_cache_group(file_path):
+    """Return the path identifying the group of that cached file: a data file and its sidecar
+       files (see 'CACHE_SIDECAR_SUFFIX_REGEX')"""
+    return re.sub(CACHE_SIDECAR_SUFFIX_REGEX, '', re.sub(r'\.validators\.json$', '', file_path))
+
+def cache_evict(max_bytes = None):
+    """Remove the least recently used groups of cache files (a data file and its sidecar files,
+       see 'get_cache_group()') until the cache total size is under the budget (except the
+       groups with a file used by the current run), and the leftover temporary files
+       (a file already removed by a concurrent run, like the background refresh, is skipped)"""
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_BYTES
+    cache_files = get_cache_files()
+    now_ts = time_ns() / 1000000000
+    for _, file_path, size, atime in cache_files:
+        if file_path.endswith('.tmp') and now_ts - atime > 86400:
+            print("DEBUG Removing leftover temporary file '"+file_path+"'", file=sys.stderr)
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+    cache_files = [f for f in cache_files if Path(f[1]).is_file()]
+    total_size = sum(f[2] for f in cache_files)
+    # group -> list of the files, the last access time of the group being its most recent one
+    cache_groups = {}
+    for cache_file in cache_files:
+        cache_groups.setdefault(get_cache_group(cache_file[1]), []).append(cache_file)
+    for group_files in sorted(cache_groups.values(), key = lambda g: max(f[3] for f in g)):
+        if total_size <= max_bytes:
+            break
+        if any(os.path.abspath(f[1]) in CACHE_FILES_IN_USE for f in group_files):
+            continue
+        for _, file_path, size, _ in group_files:
+            print("DEBUG Evicting cache file '"+file_path+"' ("+str(size)+" bytes)",
+                  file=sys.stderr)
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+def print_cache_stats():
+    """Print the cache statistics: files count, size and last access by namespace"""
+    cache_files = get_cache_files()
+    print('Cache directory:', CACHE_DIR)
+    print('')
+    print(f"   {'namespace':<20} {'files':>6} {'size (MB)':>10}  last access")
+    for namespace in CACHE_NAMESPACES:
+        files = [f for f in cache_files if f[0] == namespace]
+        size = sum(f[2] for f in files) / 1024 / 1024
+        last_access = (datetime.fromtimestamp(max(f[3] for f in files)).strftime('%Y-%m-%d %H:%M')
+                       if files else '')
+        print(f'   {namespace:<20} {len(files):>6} {size:>10.1f}  {last_access}')
+    total_size = sum(f[2] for f in cache_files) / 1024 / 1024
+    print(f"   {'TOTAL':<20} {len(cache_files):>6} {total_size:>10.1f}  "
+          f"(budget: {CACHE_MAX_BYTES / 1024 / 1024:.0f} MB)")
+    print('')
+
+def get_storage_codec_from_path(file_path):
+    """Return the storage codec of that file, from its extension"""
+    for codec, (extension, _) in STORAGE_CODECS.items():
+        if extension and file_path.endswith(extension):
+            return codec
+    return 'none'
+
+def open_storage_file(file_path, mode = 'rt', codec = None):
+    """Open a (possibly compressed) stored file, the decompression being streamed while reading.
+       The codec is guessed from the file extension when not specified."""
+    if not codec:
+        codec = get_storage_codec_from_path(file_path)
+    opener = STORAGE_CODECS[codec][1]
+    if 'b' in mode:
+        return opener(file_path, mode)
+    return opener(file_path, mode, encoding = 'utf-8')
+
+def benchmark_storage_codecs():
+    """Return a dict of codec -> (compression ratio, decompression time in seconds) measured on
+       a sample of JSON cards-like data"""
+    sample = json.dumps([
+        {'name': 'Card '+str(i), 'mana_cost': '{'+str(i % 7)+'}{G}', 'cmc': float(i % 7 + 1),
+         'type_line': 'Creature — Elf Druid', 'keywords': ['Flying', 'Trample'][:i % 3],
+         'oracle_text': ('{T}: Add {G}. When this creature enters the battlefield, draw a card '
+                         'for each creature you control with power '+str(i % 5)+' or greater.'),
+         'color_identity': ['G'], 'prices': {'usd': str(i % 13 / 3), 'eur': None}}
+        for i in range(5000)]).encode('utf-8')
+    results = {}
+    for codec, (extension, opener) in STORAGE_CODECS.items():
+        if codec == 'none':
+            continue
+        sample_file_path = pjoin(CACHE_DIR, 'storage-codec-sample'+extension)
+        with opener(sample_file_path, 'wb') as f_write:
+            f_write.write(sample)
+        compressed_size = os.path.getsize(sample_file_path)
+        start_ts_n = monotonic_ns()
+        for _ in range(3):
+            with opener(sample_file_path, 'rb') as f_read:
+                f_read.read()
+        results[codec] = (round(len(sample) / compressed_size, 1),
+                          (monotonic_ns() - start_ts_n) / 3 / 1000000000)
+        os.remove(sample_file_path)
+    return results
+
+def get_storage_codec():
+    """Return the codec used to store the cards and combos databases: 'STORAGE_CODEC' unless
+       it is 'auto', in which case the available codec with the fastest decompression is
+       selected (benchmarked once, the result being saved in the cache directory)"""
+    global STORAGE_CODEC
+    if STORAGE_CODEC != 'auto':
+        return STORAGE_CODEC
+    make_cache_dir()
+    benchmark_file_path = pjoin(CACHE_DIR, 'storage-codec.json')
+    benchmark = {}
+    if Path(benchmark_file_path).is_file():
+        with open(benchmark_file_path, 'r', encoding='utf-8') as f_read:
+            benchmark = json.load(f_read)
+    if sorted(benchmark.get('codecs', [])) != sorted(STORAGE_CODECS.keys()):
+        print('DEBUG Benchmarking storage codecs ...', file=sys.stderr)
+        results = benchmark_storage_codecs()
+        for codec, (ratio, duration) in results.items():
+            print('DEBUG   '+codec+': ratio', ratio, 'decompression', round(duration * 1000, 1),
+                  'ms', file=sys.stderr)
+        benchmark = {'codecs': list(STORAGE_CODECS.keys()),
+                     'selected': min(results, key = lambda c: results[c][1])}
+        save_json_file_atomically(benchmark, benchmark_file_path, codec = 'none')
+    STORAGE_CODEC = benchmark['selected']
+    return STORAGE_CODEC
+
+def get_storage_path(base_file_path, codec = None):
+    """Return the path of the stored file with the extension of the codec specified (default to
+       the storage codec)"""
+    return base_file_path+STORAGE_CODECS[codec or get_storage_codec()][0]
+
+def find_storage_file(base_file_path):
+    """Return the path of the stored file, whatever its codec (prefering the storage codec), or
+       'None' if there is none"""
+    codecs = [get_storage_codec()] + list(STORAGE_CODECS.keys())
+    for codec in codecs:
+        if Path(get_storage_path(base_file_path, codec)).is_file():
+            return get_storage_path(base_file_path, codec)
+    return None
 
-    if not bulk_data_file_ref.is_file() or update:
+def load_http_validators(file_path):
+    """Return the HTTP validators (and extra informations) saved for that downloaded file"""
+    validators_file_path = file_path+'.validators.json'
+    if not Path(file_path).is_file() or not Path(validators_file_path).is_file():
+        return {}
+    with open(validators_file_path, 'r', encoding='utf-8') as f_read:
+        return json.load(f_read)
+
+def save_http_validators(file_path, response_headers, **extra):
+    """Save the HTTP validators ('ETag' and 'Last-Modified' response headers) of that downloaded
+       file (plus any extra information), for later conditional requests"""
+    validators = load_http_validators(file_path) | extra
+    if response_headers is not None:
+        validators['etag'] = response_headers.get('ETag')
+        validators['last_modified'] = response_headers.get('Last-Modified')
+    save_json_file_atomically(validators, file_path+'.validators.json')
+
+def http_conditional_headers(file_path):
+    """Return the request headers to revalidate that downloaded file with a conditional GET"""
+    validators = load_http_validators(file_path)
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def rate_limit(name):
+    """Wait until the token bucket rate limiter with that name (see 'RATE_LIMITS') allows
+       one more request, then consume one token (thread safe)"""
+    rate, burst = RATE_LIMITS[name]
+    while True:
+        with RATE_LIMITERS_LOCK:
+            now_ts_n = monotonic_ns()
+            if name not in RATE_LIMITERS_STATE:
+                RATE_LIMITERS_STATE[name] = {'tokens': float(burst), 'last_ts_n': now_ts_n}
+            state = RATE_LIMITERS_STATE[name]
+            state['tokens'] = min(float(burst), state['tokens']
+                                  + (now_ts_n - state['last_ts_n']) * rate / 1000000000)
+            state['last_ts_n'] = now_ts_n
+            if state['tokens'] >= 1:
+                state['tokens'] -= 1
+                return
+            wait = (1 - state['tokens']) / rate
+        sleep(wait)
+
+def set_url_query_params(url, **params):
+    """Return the URL with the query parameters specified added (or replaced)"""
+    url_parts = urlsplit(url)
+    query = dict(parse_qsl(url_parts.query, keep_blank_values = True))
+    query |= {k: str(v) for k, v in params.items()}
+    return urlunsplit(url_parts._replace(query = urlencode(query)))
+
+def fetch_json(url, rate_limit_name = None):
+    """Return the JSON data at the URL specified, after waiting for the rate limiter (if any)"""
+    if rate_limit_name:
+        rate_limit(rate_limit_name)
+    _, _, body = http_get(url)
+    return json.loads(body)
+
+def fetch_json_pages(url, rate_limit_name = None, concurrency = 1):
+    """Yield a tuple (page URL, page data, next page URL) for each page of a paginated JSON API,
+       in order.
+
+       The next page is given by the key 'next' (CommanderSpellbook) or 'next_page' when 'has_more'
+       (Scryfall). But when the API paginates with 'limit' and 'offset' parameters and returns the
+       total 'count', all the pages URLs are computed upfront, and up to 'concurrency' pages are
+       fetched in parallel (always behind the rate limiter).
 
-        print("DEBUG Getting Scryfall bulk data from '"+SCRYFALL_API_BULK_URL+"' ...",
-            file=sys.stderr)
-        with urlopen(SCRYFALL_API_BULK_URL) as r_json:
-            bulk_data = json.load(r_json)
+       Options:
 
-        if 'object' not in bulk_data or bulk_data['object'] != 'list':
-            print('Error: the Scryfall bulk-data information is not valid.'
-                    "Key 'object' is not in the data or with an invalid value.",
-                    file=sys.stderr)
-            sys.exit(1)
+       rate_limit_name  string  The name of the rate limiter to use (see 'RATE_LIMITS')
+       concurrency       int    The maximum number of pages fetched at the same time
+    """
+    def get_next_url(data):
+        if 'next' in data:
+            return data['next']
+        if 'has_more' in data and data['has_more'] and 'next_page' in data:
+            return data['next_page']
+        return None
+
+    data = fetch_json(url, rate_limit_name)
+    next_url = get_next_url(data)
+    next_query = dict(parse_qsl(urlsplit(next_url).query)) if next_url else {}
+    if (concurrency <= 1 or not next_url or 'offset' not in next_query
+            or 'count' not in data or 'results' not in data or not data['results']):
+        yield url, data, next_url
+        while next_url:
+            url = next_url
+            data = fetch_json(url, rate_limit_name)
+            next_url = get_next_url(data)
+            yield url, data, next_url
+        return
 
-        if 'data' not in bulk_data or not bulk_data['data']:
-            print('Error: the Scryfall bulk-data information is not valid.'
-                    "Key 'data' is not in the data or with an invalid value.",
-                    file=sys.stderr)
-            sys.exit(1)
+    limit = int(next_query['limit']) if 'limit' in next_query else len(data['results'])
+    pages_urls = [set_url_query_params(next_url, limit = limit, offset = o)
+                  for o in range(int(next_query['offset']), data['count'], limit)]
+    yield url, data, pages_urls[0] if pages_urls else None
+    if not pages_urls:
+        return
 
-        new_bulk_data = bulk_data
-        while 'has_more' in new_bulk_data and new_bulk_data['has_more']:
+    def get_page(index, future):
+        data = future.result()
+        next_url = pages_urls[index + 1] if index + 1 < len(pages_urls) else get_next_url(data)
+        return pages_urls[index], data, next_url
+
+    with ThreadPoolExecutor(max_workers = concurrency) as executor:
+        try:
+            futures = deque()
+            for index, page_url in enumerate(pages_urls):
+                futures.append((index, executor.submit(fetch_json, page_url, rate_limit_name)))
+                if len(futures) >= concurrency:
+                    url, data, next_url = get_page(*futures.popleft())
+                    yield url, data, next_url
+            while futures:
+                url, data, next_url = get_page(*futures.popleft())
+                yield url, data, next_url
+        finally:
+            executor.shutdown(wait = True, cancel_futures = True)
+
+    # more pages than expected (entries added while fetching)
+    while next_url:
+        url = next_url
+        data = fetch_json(url, rate_limit_name)
+        next_url = get_next_url(data)
+        yield url, data, next_url
+
+def validate_scryfall_bulk_data(bulk_data):
+    """Exit with an error if the Scryfall bulk-data information (one page of it) is not valid"""
+    if 'object' not in bulk_data or bulk_data['object'] != 'list':
+        print('Error: the Scryfall bulk-data information is not valid.'
+                "Key 'object' is not in the data or with an invalid value.",
+                file=sys.stderr)
+        sys.exit(1)
 
-            if 'next_page' not in new_bulk_data or not new_bulk_data['next_page']:
-                print('Error: the Scryfall bulk-data information is not valid.'
-                        "Key 'next_page' is not in the data or with an invalid value.",
-                        file=sys.stderr)
-                sys.exit(1)
+    if 'data' not in bulk_data or not bulk_data['data']:
+        print('Error: the Scryfall bulk-data information is not valid.'
+                "Key 'data' is not in the data or with an invalid value.",
+                file=sys.stderr)
+        sys.exit(1)
 
-            print("DEBUG Getting Scryfall next bulk data from '"+new_bulk_data['next_page']+"' ...",
+    if ('has_more' in bulk_data and bulk_data['has_more']
+            and ('next_page' not in bulk_data or not bulk_data['next_page'])):
+        print('Error: the Scryfall bulk-data information is not valid.'
+                "Key 'next_page' is not in the data or with an invalid value.",
                 file=sys.stderr)
-            with urlopen(new_bulk_data['next_page']) as r_json:
-                new_bulk_data = json.load(r_json)
+        sys.exit(1)
 
-            if 'object' not in new_bulk_data or new_bulk_data['object'] != 'list':
-                print('Error: the Scryfall bulk-data information is not valid.'
-                        "Key 'object' is not in the data or with an invalid value.",
-                        file=sys.stderr)
-                sys.exit(1)
+def get_scryfall_bulk_data(outdir = None, update = False, offline = False):
+    """Download Scryfull bulk data informations.
 
-            if 'data' not in new_bulk_data or not new_bulk_data['data']:
-                print('Error: the Scryfall bulk-data information is not valid.'
-                        "Key 'data' is not in the data or with an invalid value.",
-                        file=sys.stderr)
-                sys.exit(1)
+       The local copy is revalidated with a conditional GET (ETag / Last-Modified), and only
+       downloaded again if it has changed. If Scryfall can't be reached, the local copy is used.
+
+       Options:
 
-            for obj in new_bulk_data['data']:
-                bulk_data['data'].append(obj)
+       outdir      string   The directory where the bulk data is going to be downloaded
+                            (default to the 'scryfall' cache directory)
+       update       bool    If 'True' force updating the bulk data on local store
+       offline      bool    If 'True' use the local copy (if any) without revalidating it
+    """
+
+    if not outdir:
+        outdir = get_cache_dir('scryfall')
+    bulk_data_file_path = pjoin(outdir, 'scryfall-bulk-data.json')
+    bulk_data_file_ref = Path(bulk_data_file_path)
+
+    status = None
+    try:
+        if offline and bulk_data_file_ref.is_file() and not update:
+            raise OSError('offline mode')
+        rate_limit('scryfall')
+        status, response_headers, body = http_get(
+            SCRYFALL_API_BULK_URL,
+            headers = http_conditional_headers(bulk_data_file_path) if not update else None)
+    except (HTTPException, OSError) as err:
+        if not bulk_data_file_ref.is_file():
+            raise
+        if not offline:
+            print("WARNING: failed to revalidate Scryfall bulk data ("+str(err)+"), "
+                  "using the local file", file=sys.stderr)
+
+    if status == 200:
+        print("DEBUG Got Scryfall bulk data from '"+SCRYFALL_API_BULK_URL+"' ...",
+              file=sys.stderr)
+        bulk_data = json.loads(body)
+        validate_scryfall_bulk_data(bulk_data)
+
+        if 'has_more' in bulk_data and bulk_data['has_more']:
+            for page_url, new_bulk_data, _ in fetch_json_pages(bulk_data['next_page'], 'scryfall'):
+                print("DEBUG Got Scryfall next bulk data from '"+page_url+"' ...",
+                    file=sys.stderr)
+                validate_scryfall_bulk_data(new_bulk_data)
+                for obj in new_bulk_data['data']:
+                    bulk_data['data'].append(obj)
 
         print("DEBUG Saving Scryfall bulk data to local file '"+bulk_data_file_path+"' ...",
               file=sys.stderr)
-        with open(bulk_data_file_path, 'w', encoding="utf8") as f_write:
-            json.dump(bulk_data, f_write)
+        save_json_file_atomically(bulk_data, bulk_data_file_path)
+        save_http_validators(bulk_data_file_path, response_headers)
 
     else:
         # print("DEBUG Getting Scryfall bulk data from local file ...")
         with open(bulk_data_file_path, 'r', encoding="utf8") as f_read:
             bulk_data = json.load(f_read)
 
+    cache_touch(bulk_data_file_path)
     return bulk_data
 
 
-def get_scryfall_cards_db(bulk_data, outdir = '/tmp', update = False):
+def get_scryfall_cards_db(bulk_data, outdir = None, update = False, offline = False):
     """Download Scryfull cards database as a JSON file.
 
-       Scryfall recommends to not download it more than once a week, so the filename
-       after downloading it to disk would contain the week number in order to prevent
-       other downloads the same week.
+       The download is skipped when the 'updated_at' date of the 'oracle_cards' bulk data has not
+       changed since the last download, otherwise the local copy is revalidated with a
+       conditional GET (ETag / Last-Modified) and only downloaded again if it has changed.
 
        Options:
 
-       outdir      string   The directory where the image is going to be downloaded
-       update       bool    If 'True' force updating the image on local store
+       outdir      string   The directory where the cards database is going to be downloaded
+                            (default to the 'scryfall' cache directory)
+       update       bool    If 'True' force updating the cards database on local store
+       offline      bool    If 'True' use the local copy (if any) without checking for updates
     """
 
     oracle_cards_src = []
@@ -1104,11 +1756,11 @@ def get_scryfall_cards_db(bulk_data, outdir = '/tmp', update = False):
                         file=sys.stderr)
                 sys.exit(1)
 
-            # if 'updated_at' not in obj or not obj['updated_at']:
-            #     print('Error: the Scryfall bulk-data information is not valid.'
-            #             "Key 'updated_at' is not in the data or with an invalid value.",
-            #             file=sys.stderr)
-            #     sys.exit(1)
+            if 'updated_at' not in obj or not obj['updated_at']:
+                print('Error: the Scryfall bulk-data information is not valid.'
+                        "Key 'updated_at' is not in the data or with an invalid value.",
+                        file=sys.stderr)
+                sys.exit(1)
 
             oracle_cards_src.append(obj)
 
@@ -1122,93 +1774,387 @@ def get_scryfall_cards_db(bulk_data, outdir = '/tmp', update = False):
                 "No 'oracle_cards' object found.", file=sys.stderr)
         sys.exit(1)
 
-    date_text = datetime.utcnow().strftime('%Y-%W')
-    cards_json_file_name = 'scryfall-oracle-cards-'+date_text+'.json'
-    cards_json_file_path = pjoin(outdir, cards_json_file_name)
+    if not outdir:
+        outdir = get_cache_dir('scryfall')
+    cards_json_base_file_path = pjoin(outdir, 'scryfall-oracle-cards.json')
+    cards_json_file_path = (find_storage_file(cards_json_base_file_path)
+                            or get_storage_path(cards_json_base_file_path))
     cards_json_file_ref = Path(cards_json_file_path)
     oracle_cards_uri = oracle_cards_src[0]['download_uri']
-    if not cards_json_file_ref.is_file() or update:
+    oracle_cards_updated_at = oracle_cards_src[0]['updated_at']
+    validators = load_http_validators(cards_json_file_path)
+    if (not cards_json_file_ref.is_file() or update
+            or (validators.get('updated_at') != oracle_cards_updated_at and not offline)):
         print("DEBUG Getting Scryfall cards JSON database from '"+oracle_cards_uri+"' ...",
               file=sys.stderr)
-        urlretrieve(oracle_cards_uri, cards_json_file_path)
+        codec = get_storage_codec()
+        cards_json_file_path_tmp = cards_json_file_path+'.'+str(os.getpid())+'.tmp'
+        try:
+            rate_limit('scryfall')
+            status, response_headers, _ = http_get(
+                oracle_cards_uri, file_path = cards_json_file_path_tmp, file_codec = codec,
+                headers = http_conditional_headers(cards_json_file_path) if not update else None)
+        except (HTTPException, OSError) as err:
+            if not cards_json_file_ref.is_file():
+                raise
+            print("WARNING: failed to get Scryfall cards JSON database ("+str(err)+"), "
+                  "using the local file", file=sys.stderr)
+            return cards_json_file_path
+        if status == 200:
+            new_cards_json_file_path = get_storage_path(cards_json_base_file_path, codec)
+            os.replace(cards_json_file_path_tmp, new_cards_json_file_path)
+            if new_cards_json_file_path != cards_json_file_path:
+                if cards_json_file_ref.is_file():
+                    os.remove(cards_json_file_path)
+                if Path(cards_json_file_path+'.validators.json').is_file():
+                    os.remove(cards_json_file_path+'.validators.json')
+                cards_json_file_path = new_cards_json_file_path
+        else:
+            print("DEBUG Scryfall cards JSON database not modified", file=sys.stderr)
+            response_headers = None
+        save_http_validators(cards_json_file_path, response_headers,
+                             updated_at = oracle_cards_updated_at)
+    cache_touch(cards_json_file_path)
     return cards_json_file_path
 
-def get_xmage_commander_banned_list(include_duel = True, update = False):
+def project_card_value(value):
+    """Return the value with its strings interned (they are heavily repeated across cards)"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [project_card_value(v) for v in value]
+    return value
+
+def project_card(card):
+    """Return a copy of the Scryfall card restricted to the fields used by the assistant
+       (see 'SCRYFALL_CARD_FIELDS' and 'SCRYFALL_CARD_FACE_FIELDS')"""
+    projected = {}
+    for field, sub_fields in SCRYFALL_CARD_FIELDS.items():
+        if field not in card:
+            continue
+        value = card[field]
+        if field == 'card_faces':
+            value = [{f: project_card_value(face[f]) for f in SCRYFALL_CARD_FACE_FIELDS
+                      if f in face}
+                     for face in value]
+        elif sub_fields and isinstance(value, dict):
+            value = {f: project_card_value(value[f]) for f in sub_fields if f in value}
+        elif field not in ['oracle_text', 'image_uris']:
+            value = project_card_value(value)
+        projected[field] = value
+    return projected
+
+def get_scryfall_cards_snapshot(cards_json_file_path, update = False, offline = False):
+    """Return the Scryfall cards list, loaded from a binary snapshot of the JSON database.
+
+       Parsing the whole JSON file is slow, so it is converted once to a pickle file
+       (same name but with a '.pickle' extension, rebuilt whenever the JSON file is newer),
+       that later runs load instead.
+       Cards are projected to the fields used by the assistant (see 'project_card()'), plus
+       their oracle texts stripped of reminder texts and self-references, in the field
+       'oracle_texts_stripped' (see 'get_stripped_oracle_texts()'). The snapshot is also rebuilt
+       when that stripping changes (see 'get_stripped_oracle_texts_hash()').
+
+       Options:
+
+       update       bool    If 'True' force rebuilding the snapshot from the JSON file
+       offline      bool    If 'True' use the existing snapshot even if the JSON file is newer
+                            (i.e.: replaced by a background refresh, that rebuilds it)
+    """
+    snapshot_file_path = re.sub(r'\.json(\.\w+)?$', '', cards_json_file_path)+'.pickle'
+    snapshot_file_ref = Path(snapshot_file_path)
+    snapshot = None
+    if (snapshot_file_ref.is_file() and not update
+            and (offline or snapshot_file_ref.stat().st_mtime
+                 >= Path(cards_json_file_path).stat().st_mtime)):
+        with open(snapshot_file_path, 'rb') as f_read:
+            snapshot = pickle.load(f_read)
+        if (not isinstance(snapshot, dict)
+                or snapshot.get('version') != SCRYFALL_CARDS_SNAPSHOT_VERSION
+                or snapshot.get('stripped') != get_stripped_oracle_texts_hash()):
+            print("DEBUG Scryfall cards snapshot '"+snapshot_file_path+"' is outdated",
+                  file=sys.stderr)
+            snapshot = None
+
+    if not snapshot:
+        print("DEBUG Building Scryfall cards snapshot '"+snapshot_file_path+"' ...",
+              file=sys.stderr)
+        with open_storage_file(cards_json_file_path, 'rt') as r_file:
+            cards = json.load(r_file)
+        snapshot = {'version': SCRYFALL_CARDS_SNAPSHOT_VERSION,
+                    'stripped': get_stripped_oracle_texts_hash(),
+                    'cards': [project_card(card) for card in cards]}
+        del cards
+        for card in snapshot['cards']:
+            if 'name' in card:
+                card['oracle_texts_stripped'] = tuple(get_stripped_oracle_texts(card))
+        snapshot_file_path_tmp = snapshot_file_path+'.'+str(os.getpid())+'.tmp'
+        with open(snapshot_file_path_tmp, 'wb') as f_write:
+            pickle.dump(snapshot, f_write, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(snapshot_file_path_tmp, snapshot_file_path)
+
+    cache_touch(snapshot_file_path)
+    return snapshot['cards']
+
+def get_stripped_oracle_texts_hash():
+    """Return a hash of the texts removed from the stripped oracle texts (see
+       'ORACLE_TEXT_REMINDER_TEXTS' and 'ORACLE_TEXT_SELF_REFERENCES_REGEXES')"""
+    return hashlib.sha256(repr((ORACLE_TEXT_REMINDER_TEXTS,
+                                ORACLE_TEXT_SELF_REFERENCES_REGEXES)).encode()).hexdigest()
+
+def get_cards_tags_rules_hash():
+    """Return a hash of the categories rules, the texts normalization they depend on and the
+       tagging code version (see 'CARDS_TAGS_RULES', 'get_stripped_oracle_texts_hash()' and
+       'CARDS_TAGS_FORMAT_VERSION')"""
+    return hashlib.sha256(repr((CARDS_TAGS_FORMAT_VERSION, CARDS_TAGS_RULES,
+                                get_stripped_oracle_texts_hash())).encode()).hexdigest()
+
+def get_card_content_hash(card):
+    """Return a hash of the card's content its categories tags depend on: its oracle id, name,
+       oracle texts, type lines and mana costs (of the card and of its faces)"""
+    parts = [card.get('oracle_id') or '', card.get('name', ''), card.get('oracle_text', ''),
+             card.get('type_line', ''), card.get('mana_cost', '')]
+    for face in card.get('card_faces') or []:
+        parts += [face.get('name', ''), face.get('oracle_text', ''), face.get('type_line', ''),
+                  face.get('mana_cost', '')]
+    return hashlib.blake2b('\x1f'.join(parts).encode(), digest_size = 16).digest()
+
+def get_cards_tags_changes(previous_cards_tags, cards_tags):
+    """Return the cards that entered or left each tag between two cards tags files
+       (see 'get_scryfall_cards_tags()'), a dict: tag -> dict(entered: names, left: names)"""
+    changes = {}
+    names = previous_cards_tags['names'] | cards_tags['names']
+    for key in set(previous_cards_tags['tags']) | set(cards_tags['tags']):
+        previous_tags = set(previous_cards_tags['tags'].get(key, ()))
+        tags = set(cards_tags['tags'].get(key, ()))
+        for change, changed_tags in (('entered', tags - previous_tags),
+                                     ('left', previous_tags - tags)):
+            for tag in changed_tags:
+                if tag not in changes:
+                    changes[tag] = {'entered': [], 'left': []}
+                changes[tag][change].append(names[key])
+    return dict(sorted(changes.items()))
+
+def print_cards_tags_changes(changes, limit = None):
+    """Print the cards that entered or left each tag (see 'get_cards_tags_changes()'),
+       to stderr"""
+    print('Cards tags changes:', file=sys.stderr)
+    print('', file=sys.stderr)
+    for tag, tag_changes in changes.items():
+        print('   '+tag+': +'+str(len(tag_changes['entered']))+' -'
+              +str(len(tag_changes['left'])), file=sys.stderr)
+        for change, sign in (('entered', '+'), ('left', '-')):
+            names = sorted(tag_changes[change])
+            for name in names[:limit]:
+                print('      '+sign+' '+name, file=sys.stderr)
+            if limit and len(names) > limit:
+                print('      '+sign+' ... ('+str(len(names) - limit)+' more)', file=sys.stderr)
+    if not changes:
+        print('   none', file=sys.stderr)
+    print('', file=sys.stderr)
+
+def get_scryfall_cards_tags(cards, cards_json_file_path, update = False):
+    """Load the categories tags of all the cards into 'CARDS_TAGS' (see 'get_card_tags()').
+
+       The tags do not depend on the commander, so they are saved to a pickle file next to the
+       cards snapshot (same name but with a '.tags.pickle' extension) and reused by later runs.
+       That file is keyed by a hash of the categories rules (see 'get_cards_tags_rules_hash()')
+       and the snapshot version, and updated when the snapshot is newer: only the cards whose
+       content hash changed (see 'get_card_content_hash()') are tagged again, the cards that
+       entered or left each tag being reported (see 'print_cards_tags_changes()').
+       When the rules, the tagging code version or the snapshot version change, all the cards
+       are tagged again.
+
+       Options:
+
+       update       bool    If 'True' force tagging again all the cards
+    """
+    base_file_path = re.sub(r'\.json(\.\w+)?$', '', cards_json_file_path)
+    tags_file_path = base_file_path+'.tags.pickle'
+    tags_file_ref = Path(tags_file_path)
+    snapshot_file_ref = Path(base_file_path+'.pickle')
+    rules_hash = get_cards_tags_rules_hash()
+    previous_cards_tags = None
+    if tags_file_ref.is_file() and not update:
+        with open(tags_file_path, 'rb') as f_read:
+            previous_cards_tags = pickle.load(f_read)
+        if not isinstance(previous_cards_tags, dict) or 'hashes' not in previous_cards_tags:
+            previous_cards_tags = None
+
+    # the cards tags are up to date
+    if (previous_cards_tags
+            and previous_cards_tags['version'] == SCRYFALL_CARDS_SNAPSHOT_VERSION
+            and previous_cards_tags['rules'] == rules_hash
+            and (not snapshot_file_ref.is_file()
+                 or tags_file_ref.stat().st_mtime >= snapshot_file_ref.stat().st_mtime)):
+        # identical tags sets are shared between the cards
+        tags_sets = {}
+        for card in cards:
+            tags = previous_cards_tags['tags'].get(card.get('oracle_id') or card.get('name'))
+            if tags is not None:
+                CARDS_TAGS[id(card)] = (card, tags_sets.setdefault(tags, frozenset(tags)))
+        cache_touch(tags_file_path)
+        return
+
+    # only the cards whose content changed are tagged again, unless the rules changed
+    reusable_cards_tags = None
+    if previous_cards_tags:
+        if (previous_cards_tags['version'] != SCRYFALL_CARDS_SNAPSHOT_VERSION
+                or previous_cards_tags['rules'] != rules_hash):
+            print("DEBUG Scryfall cards tags '"+tags_file_path+"' are outdated (rules changed)",
+                  file=sys.stderr)
+        else:
+            reusable_cards_tags = previous_cards_tags
+    print("DEBUG Tagging cards with categories to '"+tags_file_path+"' ...", file=sys.stderr)
+    cards_tags = {'version': SCRYFALL_CARDS_SNAPSHOT_VERSION, 'rules': rules_hash,
+                  'tags': {}, 'hashes': {}, 'names': {}}
+    tags_sets = {}
+    tagged_count = 0
+    for card in cards:
+        if 'name' not in card:
+            continue
+        key = card.get('oracle_id') or card['name']
+        content_hash = get_card_content_hash(card)
+        if reusable_cards_tags and reusable_cards_tags['hashes'].get(key) == content_hash:
+            tags = reusable_cards_tags['tags'][key]
+            CARDS_TAGS[id(card)] = (card, tags_sets.setdefault(tags, frozenset(tags)))
+        else:
+            tags = tuple(sorted(get_card_tags(card)))
+            tagged_count += 1
+        cards_tags['tags'][key] = tags
+        cards_tags['hashes'][key] = content_hash
+        cards_tags['names'][key] = card['name']
+    print('DEBUG Tagged '+str(tagged_count)+' cards (out of '+str(len(cards_tags['tags']))+')',
+          file=sys.stderr)
+    if previous_cards_tags:
+        print_cards_tags_changes(get_cards_tags_changes(previous_cards_tags, cards_tags),
+                                 limit = CARDS_TAGS_CHANGES_MAX_NAMES)
+
+    tags_file_path_tmp = tags_file_path+'.'+str(os.getpid())+'.tmp'
+    with open(tags_file_path_tmp, 'wb') as f_write:
+        pickle.dump(cards_tags, f_write, protocol = pickle.HIGHEST_PROTOCOL)
+    os.replace(tags_file_path_tmp, tags_file_path)
+    cache_touch(tags_file_path)
+
+def get_xmage_banned_list_file(url, file_path, update = False, offline = False):
+    """Return the list of banned cards from an XMage deck validator source file, stored to a
+       local file that is revalidated with a conditional GET (ETag / Last-Modified)
+
+       Options:
+
+       update        bool  If 'True' force updating banned list file
+       offline       bool  If 'True' use the local file (if any) without revalidating it
+    """
+    file_ref = Path(file_path)
+    status = None
+    try:
+        if offline and file_ref.is_file() and not update:
+            raise OSError('offline mode')
+        status, response_headers, webpage = http_get(
+            url, headers = http_conditional_headers(file_path) if not update else None)
+    except (HTTPException, OSError) as err:
+        if not file_ref.is_file():
+            raise
+        if not offline:
+            print("WARNING: failed to revalidate XMage banned list '"+file_path+"' ("+str(err)+
+                  "), using the local file", file=sys.stderr)
+
+    banned_cards = []
+    if status == 200:
+        print("DEBUG Got XMage banned list from '"+url+"' ...", file=sys.stderr)
+        for line in webpage.decode('utf-8').splitlines():
+            matches = re.search(XMAGE_BANNED_LINE_REGEX, line)
+            if matches:
+                banned_cards.append(matches.group('name'))
+        file_path_tmp = file_path+'.'+str(os.getpid())+'.tmp'
+        with open(file_path_tmp, 'w', encoding="utf8") as f_write:
+            for card in banned_cards:
+                f_write.write(card+'\n')
+        os.replace(file_path_tmp, file_path)
+        save_http_validators(file_path, response_headers)
+    else:
+        with open(file_path, 'r', encoding="utf8") as f_read:
+            banned_cards = list(map(str.strip, list(f_read)))
+    cache_touch(file_path)
+    return banned_cards
+
+def get_xmage_commander_banned_list(include_duel = True, update = False, offline = False):
     """Return a list of banned card for Commander format in XMage
 
        Options:
 
        include_duel  bool  If 'True' include DuelCommander format banned list
        update        bool  If 'True' force updating banned list files
+       offline       bool  If 'True' use the local files (if any) without revalidating them
     """
-    commander_banned_file_path = Path(XMAGE_COMMANDER_BANNED_LIST_FILE)
-    commander_banned_cards = []
-    if not commander_banned_file_path.is_file() or update:
-        print("DEBUG Getting XMage Commander banned list from '"+
-              XMAGE_COMMANDER_BANNED_LIST_FILE+"' ...",
-              file=sys.stderr)
-        with open(XMAGE_COMMANDER_BANNED_LIST_FILE, 'w', encoding="utf8") as f_write:
-            with urlopen(XMAGE_COMMANDER_BANNED_LIST_URL) as webpage:
-                for line in webpage:
-                    matches = re.search(XMAGE_BANNED_LINE_REGEX, line.decode('utf-8'))
-                    if matches:
-                        card = matches.group('name')
-                        commander_banned_cards.append(card)
-                        f_write.write(card+'\n')
-    else:
-        # print("Getting Commander banned list from local file ...")
-        with open(XMAGE_COMMANDER_BANNED_LIST_FILE, 'r', encoding="utf8") as f_read:
-            commander_banned_cards = list(map(str.strip, list(f_read)))
+    cache_dir = get_cache_dir('xmage')
+    commander_banned_cards = get_xmage_banned_list_file(
+        XMAGE_COMMANDER_BANNED_LIST_URL, pjoin(cache_dir, XMAGE_COMMANDER_BANNED_LIST_FILE),
+        update = update, offline = offline)
 
     if include_duel:
-        commanderduel_banned_file_path = Path(XMAGE_DUELCOMMANDER_BANNED_LIST_FILE)
-        if not commanderduel_banned_file_path.is_file() or update:
-            print("DEBUG Getting Xmage DuelCommander banned list from '"+
-                  XMAGE_DUELCOMMANDER_BANNED_LIST_FILE+"' ...",
-                  file=sys.stderr)
-            with open(XMAGE_DUELCOMMANDER_BANNED_LIST_FILE, 'w', encoding="utf8") as f_write:
-                with urlopen(XMAGE_DUELCOMMANDER_BANNED_LIST_URL) as webpage:
-                    for line in webpage:
-                        matches = re.search(XMAGE_BANNED_LINE_REGEX, line.decode('utf-8'))
-                        if matches:
-                            card = matches.group('name')
-                            commander_banned_cards.append(card)
-                            f_write.write(card+'\n')
-        else:
-            # print("DEBUG Getting DuelCommander banned list from local file '"+
-            #       XMAGE_DUELCOMMANDER_BANNED_LIST_FILE+"' ...",
-            #       file=sys.stderr)
-            with open(XMAGE_DUELCOMMANDER_BANNED_LIST_FILE, 'r', encoding="utf8") as f_read:
-                commander_banned_cards += list(map(str.strip, list(f_read)))
+        commander_banned_cards += get_xmage_banned_list_file(
+            XMAGE_DUELCOMMANDER_BANNED_LIST_URL,
+            pjoin(cache_dir, XMAGE_DUELCOMMANDER_BANNED_LIST_FILE), update = update,
+            offline = offline)
 
     return sorted(set(commander_banned_cards))
 
-def get_card_image(card, imgformat = 'small', outdir = '/tmp', update = False):
+def get_card_image_url(card, imgformat = 'small'):
+    """Return the card's image URL in the format specified (first face for multi-faces cards)"""
+    if 'image_uris' in card and imgformat in card['image_uris']:
+        return card['image_uris'][imgformat]
+    if ('card_faces' in card and card['card_faces'] and 'image_uris' in card['card_faces'][0]
+            and imgformat in card['card_faces'][0]['image_uris']):
+        return card['card_faces'][0]['image_uris'][imgformat]
+    return None
+
+def get_card_html_image_url(card):
+    """Return the URL of the card's 'normal' image shown in the HTML output (an empty string if
+       it has none): a local file URL when 'HTML_IMAGES_DIR' is set, its Scryfall URL otherwise"""
+    imgurl = get_card_image_url(card, 'normal')
+    if not imgurl:
+        return ''
+    if HTML_IMAGES_DIR is None:
+        return imgurl
+    HTML_IMAGES_CARDS[card['name']] = card
+    return Path(get_card_image_path(card, 'normal', HTML_IMAGES_DIR)).absolute().as_uri()
+
+def get_card_image_path(card, imgformat = 'small', outdir = None):
+    """Return the local path of the card's image in the format specified"""
+    if not outdir:
+        outdir = get_cache_dir('images')
+    filename = (re.sub(r'[^A-Za-z_-]', '', card['name'])+'--'+imgformat+
+                ('.jpg' if imgformat != 'png' else '.png'))
+    return pjoin(outdir, filename)
+
+def get_card_image(card, imgformat = 'small', outdir = None, update = False, verbose = True):
     """Download the card's image in format specified to the directory specified,
        and return its local path, its width and its height
+       (or 'None' if the card has no image in that format)
 
        Options:
 
        imgformat   string   See https://scryfall.com/docs/api/images
        outdir      string   The directory where the image is going to be downloaded
+                            (default to the 'images' cache directory)
        update       bool    If 'True' force updating the image on local store
+       verbose      bool    If 'True' print a debug message when downloading the image
     """
-    global LAST_SCRYFALL_CALL_TS_N
-    filename = (re.sub(r'[^A-Za-z_-]', '', card['name'])+'--'+imgformat+
-                ('.jpg' if imgformat != 'png' else '.png'))
-    filepath = pjoin(outdir, filename)
+    imgurl = get_card_image_url(card, imgformat)
+    if not imgurl:
+        return None
+    filepath = get_card_image_path(card, imgformat, outdir)
     filepathinfo = Path(filepath)
-    imgurl = card['image_uris'][imgformat]
     if not filepathinfo.is_file() or update:
-        # delaying up to 200 milliseconds like Scryfall API ask for fairness
-        now_ts_n = monotonic_ns()
-        while now_ts_n - LAST_SCRYFALL_CALL_TS_N < 200000:
-            print("DEBUG last scryfall call was less than 200 ms, sleeping 200 ms", file=sys.stderr)
-            sleep(0.2) # sleep 200 milliseconds
-            now_ts_n = monotonic_ns()
-        print("DEBUG Getting Scryfall card's image from '"+imgurl+"' ...", file=sys.stderr)
-        urlretrieve(imgurl, filepath)
-        LAST_SCRYFALL_CALL_TS_N = monotonic_ns()
+        # delaying 100 milliseconds between calls like Scryfall API ask for fairness
+        rate_limit('scryfall')
+        if verbose:
+            print("DEBUG Getting Scryfall card's image from '"+imgurl+"' ...", file=sys.stderr)
+        filepath_tmp = filepath+'.'+str(os.getpid())+'.'+str(get_ident())+'.tmp'
+        http_get(imgurl, file_path = filepath_tmp)
+        os.replace(filepath_tmp, filepath)
+    cache_touch(filepath)
     imgformats = {
         'png': (745, 1040),
         'border_crop': (480, 680),
@@ -1218,101 +2164,656 @@ def get_card_image(card, imgformat = 'small', outdir = '/tmp', update = False):
         'small': (146, 204)}
     return filepath, *(imgformats[imgformat])
 
-def get_commanderspellbook_combos(outdir = '/tmp', update = False):
+def prefetch_cards_images(cards, imgformat = 'small', outdir = None, update = False,
+                          workers = IMAGES_PREFETCH_WORKERS):
+    """Download the images of all the cards specified that are not already in the local store,
+       with a small pool of workers (all behind the Scryfall rate limiter), reporting progress.
+       Return the number of images successfully downloaded.
+
+       Options:
+
+       imgformat   string   See https://scryfall.com/docs/api/images
+       outdir      string   The directory where the images are going to be downloaded
+                            (default to the 'images' cache directory)
+       update       bool    If 'True' force updating the images on local store
+       workers      int     The number of images downloaded at the same time
+    """
+    missing = {}
+    for card in cards:
+        filepath = get_card_image_path(card, imgformat, outdir)
+        if (filepath not in missing and get_card_image_url(card, imgformat)
+                and (update or not Path(filepath).is_file())):
+            missing[filepath] = card
+    if not missing:
+        return 0
+
+    print('DEBUG Prefetching', len(missing), "cards' images ...", file=sys.stderr)
+    done = 0
+    downloaded = 0
+    with ThreadPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(get_card_image, card, imgformat, outdir, update, False)
+                   for card in missing.values()]
+        for future in as_completed(futures):
+            try:
+                future.result()
+                downloaded += 1
+            except (HTTPException, OSError) as err:
+                print("WARNING: failed to get a card's image ("+str(err)+")", file=sys.stderr)
+            done += 1
+            if done == len(futures) or not done % 10:
+                print('DEBUG   prefetched', str(downloaded)+'/'+str(len(futures)), "cards' images",
+                      '('+str(done - downloaded)+' failed)' if done > downloaded else '',
+                      file=sys.stderr)
+    return downloaded
+
+def parse_commanderspellbook_variant(res):
+    """Return a combo built from a CommanderSpellbook variant (from the API 'results'),
+       or 'None' if the variant status is not 'OK'"""
+    new_combo = {}
+
+    if 'id' not in res:
+        print("ERROR: no 'id' key in data", file=sys.stderr)
+        sys.exit(1)
+
+    combo_id = res['id']
+    new_combo['id'] = combo_id
+
+    if 'status' not in res:
+        print("ERROR: no 'status' key in data", file=sys.stderr)
+        sys.exit(1)
+    if res['status'] != 'OK':
+        print("WARNING: skipping combo '"+combo_id+"' with status '"+
+              res['status']+"'", file=sys.stderr)
+        return None
+
+    if 'produces' not in res:
+        print("ERROR: no 'produces' key in data", file=sys.stderr)
+        sys.exit(1)
+    effects = '. '.join(list(map(lambda e: e['name'], res['produces'])))
+    new_combo['r'] = effects
+
+    if 'uses' not in res:
+        print("ERROR: no 'uses' key in data", file=sys.stderr)
+        sys.exit(1)
+    cards_names = list(map(lambda u: u['card']['name'], res['uses']))
+    new_combo['c'] = cards_names
+
+    return new_combo
+
+def get_previous_commanderspellbook_combos_files(outdir, date_text):
+    """Return the paths of the most recent combos file (and its meta file) older than the week
+       specified, or 'None' if there is none"""
+    previous_files = sorted(
+        f for f in Path(outdir).glob('commanderspellbook-combos-*.json*')
+        if re.match(r'^commanderspellbook-combos-[0-9]{4}-[0-9]{2}\.json(\.\w+)?$', f.name)
+        and f.name < 'commanderspellbook-combos-'+date_text+'.json')
+    for previous_file in reversed(previous_files):
+        previous_meta_file = Path(re.sub(r'\.json(\.\w+)?$', '', str(previous_file))+'.meta.json')
+        if previous_meta_file.is_file():
+            return str(previous_file), str(previous_meta_file)
+    return None
+
+def get_commanderspellbook_combos(outdir = None, update = False, incremental = True,
+                                  api_url = COMMANDERSPELLBOOK_COMBOS_API_URL, offline = False):
     """Download CommanderSpellbook combos database as a JSON file.
 
        To avoid downloading/updating too often, the downloaded filename would contain the week
        number in order to prevent other downloads the same week.
 
+       When a previous week's combos file exists, only the variants updated since its last sync
+       are fetched (variants ordered by most recently updated first) and merged into it.
+       The sync state is kept in a '.meta.json' file next to the combos file.
+       Note: variants deleted upstream are only dropped by a full crawl.
+
+       While crawling, the progress (next page URL and combos gathered so far) is saved to a
+       '.checkpoint.json' file every 'COMMANDERSPELLBOOK_CHECKPOINT_PAGES' pages, and an
+       interrupted crawl resumes from there on the next run.
+
        Options:
 
-       outdir      string   The directory where the image is going to be downloaded
-       update       bool    If 'True' force updating the image on local store
+       outdir       string  The directory where the combos database is going to be saved
+                            (default to the 'commanderspellbook' cache directory)
+       update        bool   If 'True' force updating the combos database on local store
+       incremental   bool   If 'True' only fetch the variants updated since the previous sync
+       api_url      string  The CommanderSpellbook variants API URL
+       offline       bool   If 'True' use the most recent local combos file (if any) even if it
+                            is not this week's one
     """
 
-
+    if not outdir:
+        outdir = get_cache_dir('commanderspellbook')
     date_text = datetime.utcnow().strftime('%Y-%W')
     combos_json_file_name = 'commanderspellbook-combos-'+date_text+'.json'
-    combos_json_file_path = pjoin(outdir, combos_json_file_name)
+    combos_json_base_file_path = pjoin(outdir, combos_json_file_name)
+    combos_json_file_path = (find_storage_file(combos_json_base_file_path)
+                             or get_storage_path(combos_json_base_file_path))
     combos_json_file_ref = Path(combos_json_file_path)
+    combos_meta_file_path = pjoin(outdir, 'commanderspellbook-combos-'+date_text+'.meta.json')
+    combos_checkpoint_file_path = pjoin(
+        outdir, 'commanderspellbook-combos-'+date_text+'.checkpoint.json')
+
+    if offline and not combos_json_file_ref.is_file() and not update:
+        previous_files = get_previous_commanderspellbook_combos_files(outdir, date_text)
+        if previous_files:
+            combos_json_file_path = previous_files[0]
+            combos_json_file_ref = Path(combos_json_file_path)
 
     if not combos_json_file_ref.is_file() or update:
 
-        # new API "backend"
-        print("DEBUG Building CommanderSpellbook combos JSON database from '"
-              +COMMANDERSPELLBOOK_COMBOS_API_URL+"' ...", file=sys.stderr)
         combos = {}
+        last_updated = None
+        previous_files = None
         total_expected = 0
         current_count = 0
-        next_url = COMMANDERSPELLBOOK_COMBOS_API_URL
-        while next_url:
+        checkpoint = None
+        if Path(combos_checkpoint_file_path).is_file():
+            with open(combos_checkpoint_file_path, 'r', encoding='utf-8') as f_read:
+                checkpoint = json.load(f_read)
+        if (checkpoint and checkpoint.get('api_url') == api_url
+                and (incremental or not checkpoint.get('last_updated'))):
+            print("DEBUG Resuming CommanderSpellbook combos crawl from checkpoint '"
+                  +combos_checkpoint_file_path+"' (entries count: "
+                  +str(checkpoint['current_count'])+") ...", file=sys.stderr)
+            combos = checkpoint['combos']
+            last_updated = checkpoint['last_updated']
+            total_expected = checkpoint['total_expected']
+            current_count = checkpoint['current_count']
+            max_updated = checkpoint['max_updated']
+            next_url = checkpoint['next_url']
+        else:
+            if incremental:
+                if combos_json_file_ref.is_file() and Path(combos_meta_file_path).is_file():
+                    previous_files = (combos_json_file_path, combos_meta_file_path)
+                else:
+                    previous_files = get_previous_commanderspellbook_combos_files(outdir, date_text)
+            if previous_files:
+                with open(previous_files[1], 'r', encoding='utf-8') as f_read:
+                    last_updated = json.load(f_read).get('last_updated')
+            if last_updated:
+                print("DEBUG Syncing CommanderSpellbook combos updated since '"+last_updated+
+                      "' into '"+previous_files[0]+"' ...", file=sys.stderr)
+                with open_storage_file(previous_files[0], 'rt') as f_read:
+                    combos = json.load(f_read)
+                next_url = api_url+('&' if '?' in api_url else '?')+'ordering=-updated'
+            else:
+                # new API "backend"
+                print("DEBUG Building CommanderSpellbook combos JSON database from '"
+                      +api_url+"' ...", file=sys.stderr)
+                next_url = api_url
+            max_updated = last_updated
+
+        pages_count = 0
+        for page_url, data, next_url in fetch_json_pages(
+                next_url, 'commanderspellbook', concurrency = COMMANDERSPELLBOOK_CONCURRENCY):
             if not current_count or current_count < 501 or not current_count % 1000:
-                print("DEBUG   getting '"+next_url+"' (entries count: "+str(current_count)+") ...",
+                print("DEBUG   got '"+page_url+"' (entries count: "+str(current_count)+") ...",
                       file=sys.stderr)
-            with urlopen(next_url) as r_json:
-                data = json.load(r_json)
 
-                if not total_expected and 'count' in data:
-                    total_expected = data['count']
+            if not total_expected and 'count' in data:
+                total_expected = data['count']
 
-                if 'next' not in data:
-                    next_url = None
-                else:
-                    next_url = data['next']
-
-                if 'results' not in data:
-                    print("ERROR: no 'results' key in data", file=sys.stderr)
-                    sys.exit(1)
-
-                for res in data['results']:
-                    current_count += 1
-
-                    new_combo = {}
-
-                    if 'id' not in res:
-                        print("ERROR: no 'id' key in data", file=sys.stderr)
-                        sys.exit(1)
+            if 'results' not in data:
+                print("ERROR: no 'results' key in data", file=sys.stderr)
+                sys.exit(1)
 
-                    combo_id = res['id']
-                    new_combo['id'] = combo_id
+            for res in data['results']:
+                if last_updated:
+                    if 'updated' not in res:
+                        print("WARNING: no 'updated' key in data, falling back to a full "
+                              "crawl", file=sys.stderr)
+                        return get_commanderspellbook_combos(
+                            outdir = outdir, update = True, incremental = False,
+                            api_url = api_url)
+                    if res['updated'] <= last_updated:
+                        next_url = None
+                        break
 
-                    if 'status' not in res:
-                        print("ERROR: no 'status' key in data", file=sys.stderr)
-                        sys.exit(1)
-                    if res['status'] != 'OK':
-                        print("WARNING: skipping combo '"+combo_id+"' with status '"+
-                              res['status']+"'", file=sys.stderr)
-                        continue
+                current_count += 1
 
-                    if 'produces' not in res:
-                        print("ERROR: no 'produces' key in data", file=sys.stderr)
-                        sys.exit(1)
-                    effects = '. '.join(list(map(lambda e: e['name'], res['produces'])))
-                    new_combo['r'] = effects
+                if 'updated' in res and (not max_updated or res['updated'] > max_updated):
+                    max_updated = res['updated']
 
-                    if 'uses' not in res:
-                        print("ERROR: no 'uses' key in data", file=sys.stderr)
-                        sys.exit(1)
-                    cards_names = list(map(lambda u: u['card']['name'], res['uses']))
-                    new_combo['c'] = cards_names
+                new_combo = parse_commanderspellbook_variant(res)
+                if not new_combo:
+                    if 'id' in res and res['id'] in combos:
+                        del combos[res['id']]
+                    continue
 
-                    combos[combo_id] = new_combo
+                combos[new_combo['id']] = new_combo
 
-                if next_url:
-                    sleep(0.25)  # sleep 250 millisec
+            if not next_url:
+                break
 
-        if current_count != total_expected:
+            pages_count += 1
+            if not pages_count % COMMANDERSPELLBOOK_CHECKPOINT_PAGES:
+                save_json_file_atomically(
+                    {'api_url': api_url, 'next_url': next_url, 'combos': combos,
+                     'last_updated': last_updated, 'max_updated': max_updated,
+                     'total_expected': total_expected, 'current_count': current_count},
+                    combos_checkpoint_file_path)
+
+        if last_updated:
+            print("DEBUG Synced "+str(current_count)+" CommanderSpellbook combos updated since '"
+                  +last_updated+"'", file=sys.stderr)
+        elif current_count != total_expected:
             print("WARNING: got '"+str(current_count)+"' entries but expected '"+
                   str(total_expected)+"'", file=sys.stderr)
 
-        with open(combos_json_file_path, 'w', encoding='utf-8') as f_write:
-            json.dump(combos, f_write)
+        new_combos_json_file_path = get_storage_path(combos_json_base_file_path)
+        save_json_file_atomically(combos, new_combos_json_file_path)
+        if new_combos_json_file_path != combos_json_file_path and combos_json_file_ref.is_file():
+            os.remove(combos_json_file_path)
+        combos_json_file_path = new_combos_json_file_path
+        save_json_file_atomically({'last_updated': max_updated}, combos_meta_file_path)
+        if Path(combos_checkpoint_file_path).is_file():
+            os.remove(combos_checkpoint_file_path)
 
-    with open(combos_json_file_path, 'r', encoding='utf-8') as f_read:
+    with open_storage_file(combos_json_file_path, 'rt') as f_read:
         combos = json.load(f_read)
 
+    cache_touch(combos_json_file_path)
+    return combos
+
+def get_combo_effect_lines(effect):
+    """Return the list of the lines of a combo effect (lowercased, without the empty ones)"""
+    if not effect:
+        return []
+    return [line.strip().lower()
+            for line in effect.replace('. ', '\n').replace('..', '.').split('\n')
+            if line.strip()]
+
+def build_commanderspellbook_combos_db(combos, db_file_path):
+    """Build the SQLite combos database from the combos specified (written to a temporary file
+       then renamed), with the following tables:
+           effects      id, effect                   (the distinct effects)
+           card_names   id, name                     (the distinct card names, indexed by name)
+           combos       id, effect_id, cards_count   (indexed by effect id)
+           combo_cards  combo_id, position, name_id  (indexed by card name id)"""
+    db_file_path_tmp = db_file_path+'.'+str(os.getpid())+'.tmp'
+    if Path(db_file_path_tmp).is_file():
+        os.remove(db_file_path_tmp)
+    conn = sqlite3.connect(db_file_path_tmp)
+    try:
+        with conn:
+            conn.executescript(COMMANDERSPELLBOOK_COMBOS_DB_SCHEMA)
+            effect_ids = {}
+            name_ids = {}
+            for combo in combos.values():
+                if combo.get('r') is not None:
+                    effect_ids.setdefault(combo['r'], len(effect_ids))
+                for name in combo.get('c') or []:
+                    name_ids.setdefault(name, len(name_ids))
+            conn.executemany('INSERT INTO effects VALUES (?, ?)',
+                             ((effect_id, effect) for effect, effect_id in effect_ids.items()))
+            conn.executemany('INSERT INTO card_names VALUES (?, ?)',
+                             ((name_id, name) for name, name_id in name_ids.items()))
+            conn.executemany('INSERT INTO combos VALUES (?, ?, ?)',
+                             ((combo_id, effect_ids.get(combo.get('r')),
+                               len(combo.get('c') or []))
+                              for combo_id, combo in combos.items()))
+            conn.executemany('INSERT INTO combo_cards VALUES (?, ?, ?)',
+                             ((combo_id, position, name_ids[name])
+                              for combo_id, combo in combos.items()
+                              for position, name in enumerate(combo.get('c') or [])))
+            conn.executescript(COMMANDERSPELLBOOK_COMBOS_DB_INDEXES)
+            conn.execute('PRAGMA user_version = '+str(COMMANDERSPELLBOOK_COMBOS_DB_VERSION))
+    finally:
+        conn.close()
+    os.replace(db_file_path_tmp, db_file_path)
+
+def get_commanderspellbook_combos_db(outdir = None, update = False, offline = False):
+    """Return a (read-only) connection to the SQLite combos database, built from the combos JSON
+       database of the week (see 'get_commanderspellbook_combos()') when it does not exist yet,
+       is older than it or has another schema version (see
+       'COMMANDERSPELLBOOK_COMBOS_DB_VERSION'), so the combos could be queried without loading
+       them all in memory (see 'query_commanderspellbook_combos_db()').
+
+       The SQL functions 'REGEXP' and 'PY_LOWER' (lowercasing like Python does) are available
+       in the queries.
+    """
+    if not outdir:
+        outdir = get_cache_dir('commanderspellbook')
+    date_text = datetime.utcnow().strftime('%Y-%W')
+    db_file_path = pjoin(outdir, 'commanderspellbook-combos-'+date_text+'.sqlite')
+    combos_json_file_path = find_storage_file(
+        pjoin(outdir, 'commanderspellbook-combos-'+date_text+'.json'))
+    db_version = None
+    if Path(db_file_path).is_file() and not update:
+        conn = sqlite3.connect('file:'+db_file_path+'?mode=ro', uri = True)
+        try:
+            db_version = conn.execute('PRAGMA user_version').fetchone()[0]
+        finally:
+            conn.close()
+    if (db_version != COMMANDERSPELLBOOK_COMBOS_DB_VERSION
+            or (combos_json_file_path and os.path.getmtime(combos_json_file_path)
+                > os.path.getmtime(db_file_path))):
+        combos = get_commanderspellbook_combos(outdir = outdir, update = update,
+                                               offline = offline)
+        print("DEBUG Building CommanderSpellbook combos SQLite database '"+db_file_path+"' ...",
+              file=sys.stderr)
+        build_commanderspellbook_combos_db(combos, db_file_path)
+    conn = sqlite3.connect('file:'+db_file_path+'?mode=ro', uri = True)
+    conn.create_function('REGEXP', 2, lambda regex, text: bool(text and re.search(regex, text)),
+                         deterministic = True)
+    conn.create_function('PY_LOWER', 1, lambda text: text.lower() if text else text,
+                         deterministic = True)
+    cache_touch(db_file_path)
+    return conn
+
+def query_commanderspellbook_combos_db(conn, name = None, available_names = None,
+                                       combo_res_regex = None, max_cards = None, min_cards = None,
+                                       excludes = None):
+    """Return the combos (like 'get_commanderspellbook_combos()') of the SQLite combos database
+       matching all the criteria specified, each one being resolved with the indexes.
+
+       Options:
+           name             string   only combos with a card whose name contains that one
+           available_names  set      only combos whose cards are all in that set of names
+           combo_res_regex  string   only combos whose effect (lowercased) matches that regex
+           max_cards        int      only combos with at most this number of cards
+           min_cards        int      only combos with at least this number of cards
+           excludes         list     combos ids to exclude
+    """
+    query = 'SELECT id FROM combos WHERE 1'
+    params = []
+    if name:
+        # the name itself found with its index, and the other names containing it found among
+        # the distinct names
+        query += (' AND id IN (SELECT combo_id FROM combo_cards WHERE name_id IN ('
+                  'SELECT id FROM card_names WHERE name = ?'
+                  ' UNION ALL SELECT id FROM card_names WHERE instr(name, ?) > 0 AND name != ?))')
+        params += [name, name, name]
+    if max_cards:
+        query += ' AND cards_count <= ?'
+        params.append(max_cards)
+    if min_cards:
+        query += ' AND cards_count >= ?'
+        params.append(min_cards)
+    if combo_res_regex:
+        # evaluated once per distinct effect
+        query += ' AND effect_id IN (SELECT id FROM effects WHERE PY_LOWER(effect) REGEXP ?)'
+        params.append(combo_res_regex)
+    if available_names is not None:
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS available_names (name TEXT PRIMARY KEY)')
+        conn.execute('DELETE FROM temp.available_names')
+        conn.executemany('INSERT OR IGNORE INTO temp.available_names VALUES (?)',
+                         ((name_ok,) for name_ok in available_names))
+        query += (' AND NOT EXISTS (SELECT 1 FROM combo_cards JOIN card_names'
+                  ' ON card_names.id = combo_cards.name_id WHERE combo_id = combos.id'
+                  ' AND name NOT IN (SELECT name FROM temp.available_names))')
+    combos = {}
+    for combo_id, effect, position, card_name in conn.execute(
+            'SELECT c.id, e.effect, cc.position, n.name FROM combos c'
+            ' LEFT JOIN effects e ON e.id = c.effect_id'
+            ' JOIN combo_cards cc ON cc.combo_id = c.id JOIN card_names n ON n.id = cc.name_id'
+            ' WHERE c.id IN ('+query+') ORDER BY c.id, cc.position', params):
+        if excludes and combo_id in excludes:
+            continue
+        if combo_id not in combos:
+            combos[combo_id] = {'id': combo_id, 'r': effect, 'c': []}
+        combos[combo_id]['c'].append(card_name)
     return combos
 
+def build_combos_store(combos):
+    """Return a compact in-memory store of the combos, where card names and effects are interned
+       to integer ids, and each combo is a slice of a flat array of card ids plus an effect id:
+           ids             list   combo index -> combo id
+           names           list   card id -> card name
+           name_ids        dict   card name -> card id
+           effects         list   effect id -> effect
+           effects_lower   list   effect id -> effect lowercased
+           effects_lines   list   effect id -> tuple of the effect lines normalized
+           offsets         array  combo index -> start of its card ids in 'cards' (plus the end)
+           cards           array  the card ids of every combo (sorted by name), one after another
+           effect          array  combo index -> effect id
+           card_combos     list   card id -> array of the indexes of the combos with that card
+           records         dict   combo index -> combo record (see 'get_combo_record()')
+           color_identity  array  combo index -> color identity mask of its cards (only once
+                                  computed by 'set_combos_store_color_identities()')
+    """
+    store = {'ids': [], 'names': [], 'name_ids': {}, 'effects': [], 'effects_lower': [],
+             'effects_lines': [], 'offsets': array('L', [0]), 'cards': array('L'),
+             'effect': array('L'), 'card_combos': [], 'records': {}}
+    effect_ids = {}
+    for combo_id, combo in combos.items():
+        index = len(store['ids'])
+        store['ids'].append(combo_id)
+        for name in sorted(combo.get('c') or []):
+            if name not in store['name_ids']:
+                store['name_ids'][name] = len(store['names'])
+                store['names'].append(name)
+                store['card_combos'].append(array('L'))
+            card_id = store['name_ids'][name]
+            store['cards'].append(card_id)
+            card_combos = store['card_combos'][card_id]
+            if not card_combos or card_combos[-1] != index:
+                card_combos.append(index)
+        store['offsets'].append(len(store['cards']))
+        effect = combo.get('r')
+        if effect not in effect_ids:
+            effect_ids[effect] = len(store['effects'])
+            store['effects'].append(effect)
+            store['effects_lower'].append(effect.lower() if effect else effect)
+            store['effects_lines'].append(
+                tuple(map(combo_effect_normalize, get_combo_effect_lines(effect))))
+        store['effect'].append(effect_ids[effect])
+    return store
+
+def get_color_identity_mask(colors):
+    """Return the 5 bits mask of a color identity (a list of colors letters)"""
+    mask = 0
+    for color in colors:
+        mask |= COLORS_BITS.get(color, 0)
+    return mask
+
+def set_combos_store_color_identities(store, cards):
+    """Compute once the color identity mask of every combo of the store (the union of its cards
+       color identity, the cards being found in the cards specified)"""
+    cards_masks = array('B', (
+        get_color_identity_mask(card.get('color_identity', [])) if card else 0
+        for card in (get_card(name, cards) for name in store['names'])))
+    offsets = store['offsets']
+    store['color_identity'] = array('B', [0]) * len(store['ids'])
+    for index in range(len(store['ids'])):
+        mask = 0
+        for card_id in store['cards'][offsets[index]:offsets[index + 1]]:
+            mask |= cards_masks[card_id]
+        store['color_identity'][index] = mask
+    # the records are rebuilt with their color identity
+    store['records'] = {}
+
+def make_combo_record(combo, effect_lower = None, effect_lines = None, color_identity = None):
+    """Return the immutable record of a combo (a dict with keys 'id', 'r' and 'c'), normalized
+       once, with the following keys:
+           id              string  the combo id
+           r               string  the effect
+           r_lower         string  the effect lowercased
+           effects         tuple   the effect lines normalized (see 'combo_effect_normalize()')
+           c               tuple   the card names, sorted
+           cards_count     int     the number of cards
+           color_identity  int     the color identity mask of its cards ('None' if unknown)
+
+       The lowercased effect, its lines and the color identity mask could be specified when
+       already computed.
+    """
+    effect = combo.get('r')
+    card_names = tuple(sorted(combo.get('c') or []))
+    if effect_lower is None and effect:
+        effect_lower = effect.lower()
+    if effect_lines is None:
+        effect_lines = tuple(map(combo_effect_normalize, get_combo_effect_lines(effect)))
+    return MappingProxyType({'id': combo.get('id'), 'r': effect, 'r_lower': effect_lower,
+                             'effects': effect_lines, 'c': card_names,
+                             'cards_count': len(card_names), 'color_identity': color_identity})
+
+def get_combo_record(store, index):
+    """Return the record of the combo at that index of the combos store (built once, see
+       'make_combo_record()')"""
+    record = store['records'].get(index)
+    if record is None:
+        offsets = store['offsets']
+        effect_id = store['effect'][index]
+        record = make_combo_record(
+            {'id': store['ids'][index], 'r': store['effects'][effect_id],
+             'c': [store['names'][card_id]
+                   for card_id in store['cards'][offsets[index]:offsets[index + 1]]]},
+            effect_lower = store['effects_lower'][effect_id],
+            effect_lines = store['effects_lines'][effect_id],
+            color_identity = (store['color_identity'][index] if 'color_identity' in store
+                              else None))
+        store['records'][index] = record
+    return record
+
+def is_combos_store(combos):
+    """Return 'True' if the combos are a store built by 'build_combos_store()'"""
+    return isinstance(combos, dict) and isinstance(combos.get('offsets'), array)
+
+def query_combos_store(store, name = None, available_names = None, combo_res_regex = None,
+                       max_cards = None, min_cards = None, excludes = None,
+                       color_identity = None):
+    """Return the combos records (see 'get_combo_record()') of the combos store matching all the
+       criteria specified, cards being compared by their integer ids.
+       When a card name is specified, only the combos with that card are visited.
+
+       Options: see 'query_commanderspellbook_combos_db()', and:
+           color_identity   set      only combos within that color identity (when the combos
+                                     color identities have been computed)
+    """
+    # colors out of the color identity
+    invalid_mask = None
+    if color_identity is not None and 'color_identity' in store:
+        invalid_mask = get_color_identity_mask(ALL_COLORS - set(color_identity))
+    indexes = range(len(store['ids']))
+    if name:
+        # resolved once per name (see 'get_combos()' for the names matching)
+        names_matching = store.setdefault('names_matching', {})
+        if name not in names_matching:
+            names_matching[name] = array('L', sorted(set().union(*(
+                store['card_combos'][name_id] for name_id, card_name in enumerate(store['names'])
+                if name in card_name))))
+        indexes = names_matching[name]
+        if not indexes:
+            return {}
+    available_ids = None
+    if available_names is not None:
+        # converted once per set of names (i.e.: per cards list index)
+        if store.get('available') and store['available'][0] is available_names:
+            available_ids = store['available'][1]
+        else:
+            available_ids = set(store['name_ids'][name_ok] for name_ok in available_names
+                                if name_ok in store['name_ids'])
+            store['available'] = (available_names, available_ids)
+    excludes = set(excludes) if excludes else None
+    effects_matching = {}
+    offsets = store['offsets']
+    combos = {}
+    for index in indexes:
+        if invalid_mask and store['color_identity'][index] & invalid_mask:
+            continue
+        combo_id = store['ids'][index]
+        card_ids = store['cards'][offsets[index]:offsets[index + 1]]
+        if ((max_cards and len(card_ids) > max_cards)
+                or (min_cards and len(card_ids) < min_cards)
+                or (available_ids is not None and not available_ids.issuperset(card_ids))
+                or (excludes and combo_id in excludes)):
+            continue
+        effect_id = store['effect'][index]
+        if combo_res_regex:
+            if effect_id not in effects_matching:
+                effect_lower = store['effects_lower'][effect_id]
+                effects_matching[effect_id] = bool(
+                    effect_lower and re.search(combo_res_regex, effect_lower))
+            if not effects_matching[effect_id]:
+                continue
+        combos[combo_id] = get_combo_record(store, index)
+    return combos
+
+def build_combos_effects_index(combos):
+    """Return the vocabulary of the combos effects, a dict with the following keys:
+           counts    dict  effect (normalized line) -> its number of occurrences in the combos,
+                           ordered by the first occurrence of the effects"""
+    index = {'counts': {}}
+    for combo in combos.values():
+        for line in get_combo_effect_lines(combo.get('r')):
+            line_normalized = combo_effect_normalize(line)
+            if line_normalized not in index['counts']:
+                index['counts'][line_normalized] = 0
+            index['counts'][line_normalized] += 1
+    return index
+
+def get_commanderspellbook_combos_effects_index(outdir = None, update = False, offline = False):
+    """Return the vocabulary of the combos effects (see 'build_combos_effects_index()'), saved
+       in a '.effects.json' file next to the combos JSON database of the week, and rebuilt only
+       when it does not exist yet or is older than it"""
+    if not outdir:
+        outdir = get_cache_dir('commanderspellbook')
+    date_text = datetime.utcnow().strftime('%Y-%W')
+    index_file_path = pjoin(outdir, 'commanderspellbook-combos-'+date_text+'.effects.json')
+    combos_json_file_path = find_storage_file(
+        pjoin(outdir, 'commanderspellbook-combos-'+date_text+'.json'))
+    if (update or not Path(index_file_path).is_file()
+            or (combos_json_file_path and os.path.getmtime(combos_json_file_path)
+                > os.path.getmtime(index_file_path))):
+        combos = get_commanderspellbook_combos(outdir = outdir, update = update,
+                                               offline = offline)
+        print("DEBUG Building CommanderSpellbook combos effects index '"+index_file_path+"' ...",
+              file=sys.stderr)
+        index = build_combos_effects_index(combos)
+        save_json_file_atomically(index, index_file_path)
+    else:
+        with open(index_file_path, 'r', encoding='utf-8') as f_read:
+            index = json.load(f_read)
+    cache_touch(index_file_path)
+    return index
+
+def refresh_data():
+    """Refresh all the local data (combos with their SQLite database and effects index, XMage
+       banned lists, Scryfall cards database with its snapshot and tags), each file being
+       swapped atomically (written to a temporary file then renamed).
+
+       Only one refresh can run at a time (see 'DATA_REFRESH_LOCK_FILE').
+    """
+    make_cache_dir()
+    try:
+        lock_fd = os.open(DATA_REFRESH_LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if datetime.now().timestamp() - os.path.getmtime(DATA_REFRESH_LOCK_FILE) < 3600:
+            print("DEBUG Data refresh already running (lock file '"+DATA_REFRESH_LOCK_FILE+"')",
+                  file=sys.stderr)
+            return
+        print("WARNING: removing stale lock file '"+DATA_REFRESH_LOCK_FILE+"'", file=sys.stderr)
+        os.remove(DATA_REFRESH_LOCK_FILE)
+        lock_fd = os.open(DATA_REFRESH_LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    try:
+        os.write(lock_fd, str(os.getpid()).encode())
+        os.close(lock_fd)
+        print('DEBUG Refreshing data ...', file=sys.stderr)
+        get_commanderspellbook_combos_db().close()
+        get_commanderspellbook_combos_effects_index()
+        get_xmage_commander_banned_list()
+        scryfall_bulk_data = get_scryfall_bulk_data()
+        scryfall_cards_db_json_file = get_scryfall_cards_db(scryfall_bulk_data)
+        cards = get_scryfall_cards_snapshot(scryfall_cards_db_json_file)
+        get_scryfall_cards_tags(cards, scryfall_cards_db_json_file)
+        cache_evict()
+        print('DEBUG Data refreshed', file=sys.stderr)
+    finally:
+        os.remove(DATA_REFRESH_LOCK_FILE)
+
+def start_background_data_refresh():
+    """Start a detached process that refresh the local data for the next run
+       (see 'refresh_data()'), logging to 'DATA_REFRESH_LOG_FILE'"""
+    print("DEBUG Starting data refresh in background (log: '"+DATA_REFRESH_LOG_FILE+"') ...",
+          file=sys.stderr)
+    make_cache_dir()
+    with open(DATA_REFRESH_LOG_FILE, 'a', encoding='utf-8') as f_log:
+        subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, os.path.abspath(__file__), '--refresh-data',
+             '--cache-max-size', str(int(CACHE_MAX_BYTES / 1024 / 1024)),
+             '--storage-codec', STORAGE_CODEC],
+            stdin = subprocess.DEVNULL, stdout = f_log, stderr = subprocess.STDOUT,
+            start_new_session = True)
+
 def get_oracle_texts(card, replace_name = None):
     """Return a list of 'oracle_text', one per card's faces"""
     texts = []
@@ -1329,6 +2830,96 @@ def get_oracle_texts(card, replace_name = None):
                 texts.append(face['oracle_text'])
     return texts
 
+def get_stripped_oracle_texts(card):
+    """Return a list of 'oracle_text', one per card's faces, without the reminder texts
+       and self-references that would be taken for effects (see 'ORACLE_TEXT_REMINDER_TEXTS'
+       and 'ORACLE_TEXT_SELF_REFERENCES_REGEXES')"""
+    names = [card['name']]
+    if 'card_faces' in card and card['card_faces']:
+        names += [face['name'] for face in card['card_faces'] if face.get('name')]
+    # longest names first, because the card's name contains its faces names
+    names = sorted(set(names), key = len, reverse = True)
+    texts = []
+    for text in get_oracle_texts(card):
+        text = get_regex(ORACLE_TEXT_REMINDER_REGEX).sub('', text)
+        # names are replaced by markers matched by the compiled regex, then restored
+        for index, name in enumerate(names):
+            text = text.replace(name, '\x00'+str(index)+'\x01')
+        text = ORACLE_TEXT_SELF_REFERENCES_REGEX.sub('', text)
+        for index, name in enumerate(names):
+            text = text.replace('\x00'+str(index)+'\x01', name)
+        texts.append(text)
+    return texts
+
+def get_card_texts(card):
+    """Return the texts derived from the card's oracle texts (computed once per card, see
+       'CARDS_TEXTS'), a dict with the following keys:
+           raw             tuple   the oracle texts, one per card's faces (see 'get_oracle_texts()')
+           lower           tuple   the oracle texts lowercased
+           named           tuple   the oracle texts with the card's name replaced by '<name>'
+           named_lower     tuple   the oracle texts with the card's name replaced, lowercased
+           joined          string  the oracle texts joined (see 'join_oracle_texts()')
+           joined_lower    string  the oracle texts joined, lowercased
+           stripped        tuple   the oracle texts without the reminder texts and self-references
+                                   (see 'get_stripped_oracle_texts()'), used by the matchers
+           stripped_lower  tuple   the stripped oracle texts lowercased
+    """
+    cached = CARDS_TEXTS.get(id(card))
+    if cached and cached[0] is card:
+        return cached[1]
+    raw = tuple(get_oracle_texts(card))
+    named = tuple(get_oracle_texts(card, replace_name = '<name>'))
+    joined = join_oracle_texts(card, colorize = False)
+    # stripped texts are stored in the cards snapshot (see 'get_scryfall_cards_snapshot()')
+    stripped = tuple(card['oracle_texts_stripped'] if 'oracle_texts_stripped' in card
+                     else get_stripped_oracle_texts(card))
+    texts = {'raw': raw, 'lower': tuple(map(str.lower, raw)),
+             'named': named, 'named_lower': tuple(map(str.lower, named)),
+             'joined': joined, 'joined_lower': joined.lower(),
+             'stripped': stripped, 'stripped_lower': tuple(map(str.lower, stripped))}
+    CARDS_TEXTS[id(card)] = (card, texts)
+    return texts
+
+def get_card_tags(card):
+    """Return the categories tags of the card (a frozenset, computed once per card, see
+       'CARDS_TAGS' and 'get_scryfall_cards_tags()'), all the categories rules being evaluated
+       in a single pass over the card's texts (see 'CARDS_TAGS_RULES')"""
+    cached = CARDS_TAGS.get(id(card))
+    if cached and cached[0] is card:
+        return cached[1]
+    card_texts = get_card_texts(card)
+    tags = set()
+    for category, regexes, exclude_regex, texts_key, ignored_regex in CARDS_TAGS_RULES:
+        if not regexes:
+            continue
+        exclude_texts_key = texts_key
+        if isinstance(texts_key, tuple):
+            texts_key, exclude_texts_key = texts_key
+        texts = card_texts[texts_key]
+        if isinstance(texts, str):
+            texts = [texts]
+        if ignored_regex:
+            texts = [get_regex(ignored_regex).sub('', t) for t in texts]
+        exclude_texts = texts if exclude_texts_key == texts_key else card_texts[exclude_texts_key]
+        excluded = None
+        for feature, feature_regexes in (regexes.items() if isinstance(regexes, dict)
+                                         else [(None, regexes)]):
+            for regexp in feature_regexes:
+                if list(search_strings(regexp, texts)):
+                    # the exclude regex is only searched once a regex matched
+                    if excluded is None:
+                        excluded = bool(list(search_strings(exclude_regex, exclude_texts)))
+                    if not excluded:
+                        tags.add(category)
+                        if feature:
+                            tags.add(category+'/'+feature)
+                    break
+            if excluded:
+                break
+    tags = frozenset(tags)
+    CARDS_TAGS[id(card)] = (card, tags)
+    return tags
+
 def get_mana_cost(card, remove_braces = True):
     """Return a list of 'mana_cost', one per card's faces"""
     mana_cost = ([card['mana_cost']] if 'mana_cost' in card
@@ -1377,9 +2968,50 @@ def not_in_strings_excludes(string, excludes, texts):
     """Search for absence of a string in a list of strings or with the excludes strings"""
     return filter(lambda t: string not in t or bool([e for e in excludes if e in t]), texts)
 
+def get_regex(regex):
+    """Return the regex compiled, from the registry (see 'REGEXES') where each pattern is
+       compiled only once (so it keeps the same identity across the assists)"""
+    if isinstance(regex, re.Pattern):
+        return regex
+    compiled = REGEXES.get(regex)
+    if compiled is None:
+        compiled = re.compile(regex)
+        REGEXES[regex] = compiled
+    return compiled
+
+def regex_search(regex, text):
+    """Search a regex (compiled from the registry, see 'get_regex()') in a string, collecting
+       the search statistics of the pattern (see 'REGEXES_STATS')"""
+    compiled = get_regex(regex)
+    stats = REGEXES_STATS.get(compiled.pattern)
+    if stats is None:
+        stats = REGEXES_STATS[compiled.pattern] = [0, 0, 0]
+    start_ts_n = monotonic_ns()
+    matches = compiled.search(text)
+    stats[2] += monotonic_ns() - start_ts_n
+    stats[0] += 1
+    if matches:
+        stats[1] += 1
+    return matches
+
+def print_regex_stats(limit = None):
+    """Print the search statistics of the regexes, the slowest first (to stderr)"""
+    print('Regexes statistics ('+str(len(REGEXES))+' compiled):', file=sys.stderr)
+    print('', file=sys.stderr)
+    print(f"   {'searches':>9} {'hits':>7} {'time (ms)':>10}  pattern", file=sys.stderr)
+    stats_sorted = sorted(REGEXES_STATS.items(), key = lambda i: i[1][2], reverse = True)
+    for pattern, (searches, hits, time_n) in stats_sorted[:limit]:
+        pattern = pattern if len(pattern) <= 80 else pattern[:77]+'...'
+        print(f'   {searches:>9} {hits:>7} {time_n / 1000000:>10.1f}  {pattern}',
+              file=sys.stderr)
+    total_n = sum(stats[2] for stats in REGEXES_STATS.values())
+    print(f"   {'TOTAL':>9} {'':>7} {total_n / 1000000:>10.1f}", file=sys.stderr)
+    print('', file=sys.stderr)
+
 def search_strings(regex, texts):
-    """Search a regex in a list of strings"""
-    return filter(lambda t: re.search(regex, t), texts)
+    """Search a regex in a list of strings (see 'regex_search()')"""
+    compiled = get_regex(regex)
+    return filter(lambda t: regex_search(compiled, t), texts)
 
 def filter_empty(item):
     """Remove empty cards"""
@@ -1426,7 +3058,7 @@ def filter_no_keywords(item):
 
 def filter_no_text(item):
     """Remove cards that have no text"""
-    return any(filter(len, get_oracle_texts(item)))
+    return any(filter(len, get_card_texts(item)['raw']))
 
 def filter_stickers(item):
     """Remove cards that are Stickers"""
@@ -1479,27 +3111,27 @@ def filter_lands(item):
 def filter_sacrifice(item):
     """Remove card if its text contains 'sacrifice' without containing 'unless'"""
     return bool(list(not_in_strings_exclude('sacrifice', 'unless',
-                                            map(str.lower, get_oracle_texts(item)))))
+                                            get_card_texts(item)['lower'])))
 
 def filter_tapped(item):
     """Remove card if its text contains ' tapped'"""
-    return not bool(list(in_strings('tapped', map(str.lower, get_oracle_texts(item)))))
+    return not bool(list(in_strings('tapped', get_card_texts(item)['lower'])))
 
 def filter_tapped_or_untappable(item):
     """Remove card if its text contains ' tapped' without containing 'tapped if' or 'unless'
        or 'become tapped' or 'untap' or 'tap an untapped' or 'create a tapped '"""
     return (
         not bool(list(in_strings(item['name']+' enters the battlefield tapped.',
-                                 get_oracle_texts(item))))
+                                 get_card_texts(item)['raw'])))
         and bool(list(not_in_strings_excludes(
                 'tapped',
                 ['tapped if', 'unless', 'become tapped', 'becomes tapped', 'untap', 'tap an untapped',
                 'create a tapped '],
-                map(str.lower, get_oracle_texts(item))))))
+                get_card_texts(item)['lower']))))
 
 def filter_add_one_colorless_mana(item):
     """Remove card if its text contains '{T}: Add {C}'"""
-    return not bool(list(in_strings('{T}: Add {C}', get_oracle_texts(item))))
+    return not bool(list(in_strings('{T}: Add {C}', get_card_texts(item)['raw'])))
 
 def filter_multicolors_lands(item):
     """Keep only lands that can produce all colors"""
@@ -1682,7 +3314,7 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
     cards_lands_multicolors = list(filter(filter_multicolors_lands, lands))
     cards_lands_multicolors_generic_enough = list(filter(
         lambda c: not list(search_strings(LAND_MULTICOLORS_GENERIC_EXCLUDE_REGEX,
-                                            map(str.lower, get_oracle_texts(c)))),
+                                            get_card_texts(c)['lower'])),
         cards_lands_multicolors))
     cards_lands_multicolors_no_tapped = list(filter(
         filter_tapped_or_untappable, cards_lands_multicolors_generic_enough))
@@ -1690,7 +3322,7 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
         c for c in cards_lands_multicolors if c not in cards_lands_multicolors_no_tapped]
     cards_lands_multicolors_filtered = list(filter(
         lambda c: not list(search_strings(LAND_MULTICOLORS_EXCLUDE_REGEX,
-        map(str.lower, get_oracle_texts(c)))),
+        get_card_texts(c)['lower'])),
             filter(filter_add_one_colorless_mana,
                 filter(filter_sacrifice,
                     filter(filter_tapped,
@@ -1702,7 +3334,7 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
         c for c in cards_lands_multicolors_tapped if c not in cards_lands_multicolors_filtered]
     cards_lands_multicolors_producers = list(filter(
         lambda c: bool(list(search_strings(
-            r'(^\s*|\n|\r|[^,] )\{T\}: Add ', get_oracle_texts(c)))),
+            r'(^\s*|\n|\r|[^,] )\{T\}: Add ', get_card_texts(c)['raw']))),
         [c for c in cards_lands_multicolors_generic_enough
             if c not in cards_lands_multicolors_filtered]))
 
@@ -1711,7 +3343,7 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
     cards_lands_converters_colorless_producers = list(filter(
         lambda c: c['name'] == "Cascading Cataracts" or bool(list(search_strings(
             r'\{T\}: Add \{C\}.(\s+|\n|\r)?\{\d+\}, \{T\}: Add one mana of any color',
-            get_oracle_texts(c)))),
+            get_card_texts(c)['raw']))),
         cards_lands_multicolors_producers))
     cards_lands_converters_colorless_producers_not_tapped = list(filter(
         filter_tapped_or_untappable, cards_lands_converters_colorless_producers))
@@ -1729,11 +3361,11 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
         lambda c: bool(
             # shity
             not list(in_strings(
-                '{T}, Sacrifice '+c['name']+': Add one mana of any color', get_oracle_texts(c)))
+                '{T}, Sacrifice '+c['name']+': Add one mana of any color', get_card_texts(c)['raw']))
             # shity
             and not list(in_strings(
                 'When '+c['name']+' enters the battlefield, add one mana of any color',
-                get_oracle_texts(c)))
+                get_card_texts(c)['raw']))
             # shity
             and c['name'] != "Springjack Pasture"
             # specific
@@ -1751,24 +3383,24 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
     cards_lands_multicolors_producers_tapped_filtered = list(filter(
         lambda c: bool(
             # pay {1} or sacrifice it
-            not list(in_strings('sacrifice it unless you pay {1}', get_oracle_texts(c)))
+            not list(in_strings('sacrifice it unless you pay {1}', get_card_texts(c)['raw']))
             # color selection: mono color
             and not list(in_strings(
-                '{T}: Add one mana of the chosen color', get_oracle_texts(c)))
+                '{T}: Add one mana of the chosen color', get_card_texts(c)['raw']))
             # color selection: bi-color
             and not list(search_strings(
-                r'\{T\}: Add \{\w\} or one mana of the chosen color', get_oracle_texts(c)))
+                r'\{T\}: Add \{\w\} or one mana of the chosen color', get_card_texts(c)['raw']))
             and not list(in_strings(
-                '{T}: Add one mana of either of the circled colors', get_oracle_texts(c)))
+                '{T}: Add one mana of either of the circled colors', get_card_texts(c)['raw']))
             # charge counter
             and not list(in_strings(
                 '{T}, Remove a charge counter from '+c['name']+': Add one mana of any color',
-                get_oracle_texts(c)))),
+                get_card_texts(c)['raw']))),
         cards_lands_multicolors_producers_tapped))
 
     # multicolors producers that produce mana only for a given spell type
     cards_lands_multicolors_producers_not_tapped_selective = list(filter(
-        lambda c: list(in_strings('only to cast', map(str.lower, get_oracle_texts(c)))),
+        lambda c: list(in_strings('only to cast', get_card_texts(c)['lower'])),
         cards_lands_multicolors_producers_not_tapped))
     cards_lands_multicolors_producers_not_tapped_not_selective = [
         c for c in cards_lands_multicolors_producers_not_tapped
@@ -1779,7 +3411,7 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
     # TODO exclude them ?
     cards_lands_converters_no_producers = list(filter(
         lambda c: bool(list(search_strings(r'\{\d+\}, \{T\}: Add one mana of any color',
-                                            get_oracle_texts(c)))),
+                                            get_card_texts(c)['raw']))),
         [c for c in cards_lands_multicolors_generic_enough
             if c not in cards_lands_converters_colorless_producers]))
     cards_lands_converters_no_producers_not_tapped = list(filter(
@@ -1794,7 +3426,7 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
 
     # tri-colors lands
     cards_lands_tricolors = list(filter(
-        lambda c: not bool(list(in_strings('return', map(str.lower, get_oracle_texts(c))))),
+        lambda c: not bool(list(in_strings('return', get_card_texts(c)['lower']))),
         filter(filter_add_one_colorless_mana,
                 filter(filter_tricolors_lands, lands))))
 
@@ -1803,10 +3435,10 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
     cards_lands_bicolors_filtered = list(filter(
         lambda c: (
             ' // ' not in c['name']
-            and not list(in_strings('storage counter', get_oracle_texts(c)))
-            and not list(in_strings("doesn't untap", get_oracle_texts(c)))
+            and not list(in_strings('storage counter', get_card_texts(c)['raw']))
+            and not list(in_strings("doesn't untap", get_card_texts(c)['raw']))
             and not list(search_strings(LAND_BICOLORS_EXCLUDE_REGEX,
-                                        map(str.lower, get_oracle_texts(c))))),
+                                        get_card_texts(c)['lower']))),
         cards_lands_bicolors))
     cards_lands_bicolors_filtered_not_tapped = list(filter(filter_tapped_or_untappable,
         cards_lands_bicolors_filtered))
@@ -1824,13 +3456,13 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
     # land fetcher
     cards_lands_sacrifice_search = list(
         filter(
-            lambda c: not list(in_strings('destroy', map(str.lower, get_oracle_texts(c)))),
+            lambda c: not list(in_strings('destroy', get_card_texts(c)['lower'])),
             filter(
                 lambda c: not list(search_strings(land_types_invalid_regex,
-                                                    map(str.lower, get_oracle_texts(c)))),
+                                                    get_card_texts(c)['lower'])),
                 filter(
                     lambda c: list(search_strings(LAND_SACRIFICE_SEARCH_REGEX,
-                                                    map(str.lower, get_oracle_texts(c)))),
+                                                    get_card_texts(c)['lower'])),
                     lands))))
     cards_lands_sacrifice_search_no_tapped = list(
         filter(filter_tapped_or_untappable, cards_lands_sacrifice_search))
@@ -1838,9 +3470,9 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
         c for c in cards_lands_sacrifice_search if c not in cards_lands_sacrifice_search_no_tapped]
 
     cards_lands_producers_non_basic = list(filter(
-        lambda c: (bool(list(search_strings('gains?|loses?', get_oracle_texts(c))))
+        lambda c: (bool(list(search_strings('gains?|loses?', get_card_texts(c)['raw'])))
                    and not bool(list(search_strings('(gains?|loses?) [^.]*life',
-                                                    get_oracle_texts(c))))),
+                                                    get_card_texts(c)['raw'])))),
         filter(
             lambda c: not c['type_line'].lower().startswith('basic land'),
             [c for c in lands if c not in cards_lands_multicolors_generic_enough
@@ -1854,11 +3486,11 @@ def assist_land_selection(lands, land_types_invalid_regex, max_list_items = None
     # cards_lands_producers_non_basic = list(filter(
     #         lambda c: (
     #             bool(list(search_strings(r'(\s+|\n|\r)?\{T\}: Add \{\w\}',
-    #                                         get_oracle_texts(c))))
-    #             and not bool(list(in_strings('roll a', map(str.lower, get_oracle_texts(c)))))
-    #             and not bool(list(in_strings('phased out', map(str.lower, get_oracle_texts(c)))))
+    #                                         get_card_texts(c)['raw'])))
+    #             and not bool(list(in_strings('roll a', get_card_texts(c)['lower'])))
+    #             and not bool(list(in_strings('phased out', get_card_texts(c)['lower'])))
     #             and not bool(list(in_strings('venture into the dungeon',
-    #                                         map(str.lower, get_oracle_texts(c)))))),
+    #                                         get_card_texts(c)['lower'])))),
     #         filter(
     #             lambda c: not c['type_line'].lower().startswith('basic land'),
     #             [c for c in lands if c not in cards_lands_multicolors_generic_enough
@@ -2073,8 +3705,7 @@ def assist_land_fetch(cards, land_types_invalid_regex, max_list_items = None, ou
     named_basic_land_regex = ('('+('|'.join(BASIC_LAND_NAMES))+')').lower()
 
     for card in cards:
-        card_oracle_texts = list(get_oracle_texts(card))
-        card_oracle_texts_low = list(map(str.lower, card_oracle_texts))
+        card_oracle_texts_low = list(get_card_texts(card)['lower'])
         if not list(search_strings(land_types_invalid_regex, card_oracle_texts_low)):
             if card['name'] not in ["Strata Scythe", "Trench Gorger", "Hired Giant"]:
                 if list(search_strings(LAND_CYCLING_REGEX, card_oracle_texts_low)):
@@ -2091,8 +3722,7 @@ def assist_land_fetch(cards, land_types_invalid_regex, max_list_items = None, ou
 
     cards_land_fetch_by_feature = {}
     for card in cards_land_fetch:
-        card_oracle_texts = list(get_oracle_texts(card))
-        card_oracle_texts_low = list(map(str.lower, card_oracle_texts))
+        card_oracle_texts_low = list(get_card_texts(card)['lower'])
         conditional = (bool(list(in_strings('more lands', card_oracle_texts_low)))
                        or bool(list(in_strings('fewer lands', card_oracle_texts_low))))
         cond_text = ', conditional' if conditional else ''
@@ -2370,12 +4000,7 @@ def print_card(card, indent = 0, print_mana = True, print_type = True, print_pow
 
         name = card['name']
         # TODO display both faces
-        imgurl = ''
-        if 'image_uris' in card and 'normal' in card['image_uris']:
-            imgurl = card['image_uris']['normal']
-        elif ('card_faces' in card and card['card_faces'] and 'image_uris' in card['card_faces'][0]
-              and 'normal' in card['card_faces'][0]['image_uris']):
-            imgurl = card['card_faces'][0]['image_uris']['normal']
+        imgurl = get_card_html_image_url(card)
         img_element = '<img src="#" data-imgurl="'+imgurl+'" alt="image of card '+name.replace('"', '&quot;')+'" />'
         if not imgurl:
             img_element = '<span class="card-not-found">/<span>'
@@ -2509,24 +4134,25 @@ def assist_ramp_cards(cards, land_types_invalid_regex, max_list_items = None, ou
     cards_ramp_cards = []
     cards_ramp_cards_by_features = {}
     for card in cards:
-        if card['name'] not in ["Strata Scythe", "Trench Gorger"]:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            if (not list(search_strings(RAMP_CARDS_EXCLUDE_REGEX, oracle_texts_low))
-                    and not list(search_strings(land_types_invalid_regex, oracle_texts_low))
+        tags = get_card_tags(card)
+        if card['name'] not in ["Strata Scythe", "Trench Gorger"] and 'ramp' in tags:
+            oracle_texts = list(get_card_texts(card)['stripped'])
+            oracle_texts_low = list(get_card_texts(card)['stripped_lower'])
+            if (not list(search_strings(land_types_invalid_regex, oracle_texts_low))
                     # and not list(search_strings(r'(you|target player|opponent).*discard',
                     #                             oracle_texts_low))
                     # and not list(in_strings('graveyard', oracle_texts_low))
                     and not filter_lands(card)
                     and ('card_faces' not in card or not filter_lands(card['card_faces'][1]))):
-                for feature, regexes in RAMP_CARDS_REGEX_BY_FEATURES.items():
-                    regex = r'('+('|'.join(regexes))+')'
-                    if list(search_strings(regex, oracle_texts_low)):
+                for feature in RAMP_CARDS_REGEX_BY_FEATURES:
+                    if 'ramp/'+feature in tags:
                         malus = 'no malus'
                         if feature in RAMP_CARDS_MALUS_REGEX:
+                            # the regexes refer to the card by '<name>'
+                            oracle_texts_named = [t.replace(card['name'], '<name>')
+                                                  for t in oracle_texts]
                             for regexp in RAMP_CARDS_MALUS_REGEX[feature]:
-                                reg = regexp.replace('<name>', card['name'])
-                                if list(search_strings(reg, oracle_texts)):
+                                if list(search_strings(regexp, oracle_texts_named)):
                                     malus = 'malus'
                                     break
                         # special case for 'mana'
@@ -2604,31 +4230,29 @@ def assist_draw_cards(cards, land_types_invalid_regex, max_list_items = None, ou
     cards_draw_multiple = []
     if DRAW_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for regexp in DRAW_CARDS_REGEX:
-                if (list(search_strings(regexp, oracle_texts_low))
-                        and not list(search_strings(DRAW_CARDS_EXCLUDE_REGEX, oracle_texts_low))
-                        and not list(search_strings(land_types_invalid_regex, oracle_texts_low))
-                        # and not list(search_strings(r'(you|target player|opponent).*discard',
-                        #                             oracle_texts_low))
-                        # and not list(in_strings('graveyard', oracle_texts_low))
-                        and not filter_lands(card)):
-                    cards_draw.append(card)
-
-                    if (list(search_strings(r'(whenever|everytime|at begining|upkeep|\\{\w\\}:)',
-                                           oracle_texts_low))
-                            and not list(in_strings("next turn's upkeep", oracle_texts_low))
-                            and not list(in_strings('Sacrifice '+card['name'], oracle_texts))
-                            and not list(search_strings(
-                                r'whenever [^.]+ deals combat damage to a player',
-                                oracle_texts_low))):
-                        cards_draw_repeating.append(card)
-
-                    elif list(search_strings(r'draws? (two|three|four|five|six|seven|x) ',
-                                             oracle_texts_low)):
-                        cards_draw_multiple.append(card)
-                    break
+            if 'draw' not in get_card_tags(card):
+                continue
+            oracle_texts = list(get_card_texts(card)['stripped'])
+            oracle_texts_low = list(get_card_texts(card)['stripped_lower'])
+            if (not list(search_strings(land_types_invalid_regex, oracle_texts_low))
+                    # and not list(search_strings(r'(you|target player|opponent).*discard',
+                    #                             oracle_texts_low))
+                    # and not list(in_strings('graveyard', oracle_texts_low))
+                    and not filter_lands(card)):
+                cards_draw.append(card)
+
+                if (list(search_strings(r'(whenever|everytime|at begining|upkeep|\\{\w\\}:)',
+                                       oracle_texts_low))
+                        and not list(in_strings("next turn's upkeep", oracle_texts_low))
+                        and not list(in_strings('Sacrifice '+card['name'], oracle_texts))
+                        and not list(search_strings(
+                            r'whenever [^.]+ deals combat damage to a player',
+                            oracle_texts_low))):
+                    cards_draw_repeating.append(card)
+
+                elif list(search_strings(r'draws? (two|three|four|five|six|seven|x) ',
+                                         oracle_texts_low)):
+                    cards_draw_multiple.append(card)
     cards_draw = list(sorted(cards_draw, key=lambda c: c['cmc']))
 
     cards_draw_not_repeating = sort_cards_by_cmc_and_name(
@@ -2636,7 +4260,7 @@ def assist_draw_cards(cards, land_types_invalid_regex, max_list_items = None, ou
          and c not in cards_draw_multiple])
 
     connives = list(filter(lambda c: bool(list(
-        in_strings('connives', map(str.lower, get_oracle_texts(c))))), cards))
+        in_strings('connives', get_card_texts(c)['stripped_lower']))), cards))
 
     draw_output_data = {
         'repeating': organize_by_type(cards_draw_repeating),
@@ -2710,35 +4334,19 @@ def assist_tutor_cards(cards, land_types_invalid_regex, max_list_items = None, o
     for card in cards:
         if 'tutor' in card['name'].lower():
             cards_tutor.append(card)
-        elif TUTOR_CARDS_REGEX:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            card_found = False
-            for regexp in TUTOR_CARDS_REGEX:
-                if (list(search_strings(regexp, oracle_texts_low))
-                        and not list(search_strings(TUTOR_CARDS_EXCLUDE_REGEX, oracle_texts_low))
-                        and not list(search_strings(land_types_invalid_regex, oracle_texts_low))
-                        and not filter_lands(card)):
-                    cards_tutor.append(card)
-                    card_found = True
-                    break
-            if not card_found and TUTOR_CARDS_JOIN_TEXTS_REGEX:
-                for regexp in TUTOR_CARDS_JOIN_TEXTS_REGEX:
-                    if (re.search(regexp, join_oracle_texts(card).lower())
-                            and not list(search_strings(TUTOR_CARDS_EXCLUDE_REGEX, oracle_texts_low))
-                            and not list(search_strings(land_types_invalid_regex, oracle_texts_low))
-                            and not filter_lands(card)):
-                        cards_tutor.append(card)
-                        card_found = True
-                        break
+        elif (TUTOR_CARDS_REGEX and 'tutor' in get_card_tags(card)
+              and not list(search_strings(land_types_invalid_regex,
+                                          get_card_texts(card)['lower']))
+              and not filter_lands(card)):
+            cards_tutor.append(card)
 
     # filter out not generic enough cards
     cards_tutor_generic = list(filter(
         lambda c: (not list(search_strings(TUTOR_GENERIC_EXCLUDE_REGEX,
-                                          map(str.lower, get_oracle_texts(c))))
-                   or (re.search(TUTOR_GENERIC_EXCLUDE_REGEX, c['name'].lower())
+                                          get_card_texts(c)['lower']))
+                   or (regex_search(TUTOR_GENERIC_EXCLUDE_REGEX, c['name'].lower())
                        and list(in_strings('When '+c['name']+' enters the battlefield',
-                                           get_oracle_texts(c))))),
+                                           get_card_texts(c)['raw'])))),
         cards_tutor))
 
     # regroup some cards by theme
@@ -2747,29 +4355,29 @@ def assist_tutor_cards(cards, land_types_invalid_regex, max_list_items = None, o
                         'opponent',
                         ['opponent choose', 'choose an opponent', 'opponent gains control',
                          'opponent looks at'],
-                        map(str.lower, get_oracle_texts(c))))
-                   or list(in_strings('counter target', map(str.lower, get_oracle_texts(c))))
-                   or list(in_strings('destroy', map(str.lower, get_oracle_texts(c))))),
+                        get_card_texts(c)['lower']))
+                   or list(in_strings('counter target', get_card_texts(c)['lower']))
+                   or list(in_strings('destroy', get_card_texts(c)['lower']))),
         cards_tutor_generic))
     cards_tutor_aura = list(filter(
-        lambda c: list(in_strings_exclude('Aura', 'Auramancers', get_oracle_texts(c))),
+        lambda c: list(in_strings_exclude('Aura', 'Auramancers', get_card_texts(c)['raw'])),
         cards_tutor_generic))
     cards_tutor_equipment = list(filter(
-        lambda c: list(in_strings('Equipment', get_oracle_texts(c))),
+        lambda c: list(in_strings('Equipment', get_card_texts(c)['raw'])),
         cards_tutor_generic))
     cards_tutor_artifact = list(filter(
         lambda c: list(in_strings_excludes(
             'artifact', ['artifact and/or', 'artifact or', 'artifact, creature'],
-            map(str.lower, get_oracle_texts(c)))),
+            get_card_texts(c)['lower'])),
         [c for c in cards_tutor_generic if c not in cards_tutor_equipment]))
     cards_tutor_transmute = list(filter(
-        lambda c: list(in_strings('transmute', map(str.lower, get_oracle_texts(c)))),
+        lambda c: list(in_strings('transmute', get_card_texts(c)['lower'])),
         [c for c in cards_tutor_generic if c not in cards_tutor_equipment]))
     cards_tutor_graveyard = list(filter(
         lambda c: c['name'] != 'Dark Petition' and list(in_strings_excludes(
             'graveyard', ["if you don't, put it into", 'graveyard from play',
                           'the other into your graveyard', 'cast from a graveyard'],
-            map(str.lower, get_oracle_texts(c)))),
+            get_card_texts(c)['lower'])),
         cards_tutor_generic))
 
     cards_tutor_themed = (
@@ -2783,14 +4391,14 @@ def assist_tutor_cards(cards, land_types_invalid_regex, max_list_items = None, o
         c for c in cards_tutor_generic if c not in cards_tutor_themed]
 
     cards_tutor_to_battlefield = list(filter(
-        lambda c: list(in_strings('onto the battlefield', map(str.lower, get_oracle_texts(c)))),
+        lambda c: list(in_strings('onto the battlefield', get_card_texts(c)['lower'])),
         cards_tutor_not_themed))
     cards_tutor_to_hand = list(filter(
-        lambda c: list(in_strings('hand', map(str.lower, get_oracle_texts(c)))),
+        lambda c: list(in_strings('hand', get_card_texts(c)['lower'])),
         [c for c in cards_tutor_not_themed if c not in cards_tutor_to_battlefield]))
     cards_tutor_to_top_library = list(filter(
-        lambda c: (list(in_strings('that card on top', map(str.lower, get_oracle_texts(c))))
-                   or list(in_strings('third from the top', map(str.lower, get_oracle_texts(c))))),
+        lambda c: (list(in_strings('that card on top', get_card_texts(c)['lower']))
+                   or list(in_strings('third from the top', get_card_texts(c)['lower']))),
         [c for c in cards_tutor_not_themed if c not in cards_tutor_to_battlefield
          and c not in cards_tutor_to_hand]))
     cards_tutor_other = [
@@ -2881,83 +4489,42 @@ def assist_removal_cards(cards, max_list_items = None, outformat = 'console'):
     cards_removal_selected = []
     cards_removal = []
     if REMOVAL_CARDS_REGEX:
-        for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_filtered = list(map(lambda t: (
-                t.replace('(Then exile this card. You may cast the creature later from exile.)', '')
-                 .replace('(Then exile this card. You may cast the artifact later from exile.)', '')
-                 .replace("(Effects that say "+'"destroy"'+" don't destroy this artifact.)", '')
-                 .replace("(Damage and effects that say "+'"destroy"'+" don't destroy them.)", '')
-                 .replace("(Damage and effects that say "+'"destroy"'+" don't destroy it.)", '')
-                 .replace("(Any amount of damage it deals to a creature is enough to destroy it.)",
-                          '')
-                 .replace("(You may cast this spell for its cleave cost. If you do, remove the"+
-                          " words in square brackets.)", '')
-                 .replace("(If you discard this card, discard it into exile. When you do, cast it"+
-                          " for its madness cost or put it into your graveyard.)", '')
-                 .replace('(You may cast this card from your graveyard for its flashback cost. '+
-                          'Then exile it.)', '')
-                 .replace('(You may cast this card from your graveyard for its flashback cost '+
-                          'and any additional costs. Then exile it.)', '')
-                 .replace('Exile this Saga, then return it to the battlefield transformed', '')
-                 .replace('Exile '+card['name'], '')  # pylint: disable=cell-var-from-loop
-                 .replace('Exile '+card['name']+'. Return it to the battlefield', '')  # pylint: disable=cell-var-from-loop
-                 .replace('destroy '+card['name'], '')  # pylint: disable=cell-var-from-loop
-                 .replace('Return '+card['name']+" to its owner's hand", '')  # pylint: disable=cell-var-from-loop
-                 .replace('return '+card['name']+" to its owner's hand", '')  # pylint: disable=cell-var-from-loop
-                 .replace('If '+card['name']+' would be put into a graveyard from anywhere, '+  # pylint: disable=cell-var-from-loop
-                          'exile it instead.', '')),
-                oracle_texts))
-            if 'card_faces' in card:
-                for face in card['card_faces']:
-                    oracle_texts_filtered = list(map(lambda t: (
-                        t.replace('Exile '+face['name'], '')  # pylint: disable=cell-var-from-loop
-                         .replace('destroy '+face['name'], '')  # pylint: disable=cell-var-from-loop
-                         .replace('If '+face['name']+' would be put into a graveyard from anywhere'+  # pylint: disable=cell-var-from-loop
-                                  ', exile it instead.', '')),
-                        oracle_texts_filtered))
-            oracle_texts_low = list(map(str.lower, oracle_texts_filtered))
-            for regexp in REMOVAL_CARDS_REGEX:
-                if (list(search_strings(regexp, oracle_texts_low))
-                        and not list(search_strings(REMOVAL_CARDS_EXCLUDE_REGEX,
-                                                    oracle_texts_low))):
-                    cards_removal.append(card)
-                    break
+        cards_removal = [c for c in cards if 'removal' in get_card_tags(c)]
 
     cards_removal_return_to_hand = list(filter(
         lambda c: bool(list(search_strings(r"returns? .* to (its|their) owner('s|s') hand",
-                                           list(map(str.lower, get_oracle_texts(c)))))),
+                                           get_card_texts(c)['stripped_lower']))),
         cards_removal))
 
     cards_removal_put_to_library_bottom = list(filter(
         lambda c: bool(list(search_strings(
             r"puts? .* on the bottom of (its|their) owner('s|s') library",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_removal))
     cards_removal_put_to_library_top = list(filter(
         lambda c: bool(list(search_strings(r"puts? .* on top of (its|their) owner('s|s') library",
-                                           list(map(str.lower, get_oracle_texts(c)))))),
+                                           get_card_texts(c)['stripped_lower']))),
         cards_removal))
     cards_removal_put_to_library_other = list(filter(
         lambda c: bool(list(search_strings(
             r"(puts? .* into (its|their) owner('s|s') library|shuffles it into (its|their) library)",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_removal))
 
     cards_removal_untargetted = list(filter(
         lambda c: bool(list(search_strings(
             r"(target|each|every) (opponents?|players?) sacrifices? an?( attacking)? creature",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_removal))
 
     cards_removal_creature_toughness_malus = list(filter(
         lambda c: bool(list(search_strings(
             r"creatures? gets? [+-][0-9Xx]+/-[1-9Xx]+",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_removal))
 
     cards_removal_destroy_land = list(filter(lambda c: bool(list(
-        search_strings('destroy target (nonbasic )?land', map(str.lower, get_oracle_texts(c))))),
+        search_strings('destroy target (nonbasic )?land', get_card_texts(c)['stripped_lower']))),
         cards_removal))
     cards_removal_not_destroy_land = [
         c for c in cards_removal if c not in cards_removal_destroy_land]
@@ -2965,7 +4532,7 @@ def assist_removal_cards(cards, max_list_items = None, outformat = 'console'):
     # group by target type
     cards_removal_destroy_permanent = list(filter(lambda c: bool(list(
         search_strings(r'(destroy|exile) target (\w+ )?permanent',
-                       map(str.lower, get_oracle_texts(c))))),
+                       get_card_texts(c)['stripped_lower']))),
         cards_removal_not_destroy_land))
     cards_removal_destroy_three = list(filter(lambda c: bool(list(
         search_strings(r'(destroy|exile) target (\w+ )?('
@@ -2975,7 +4542,7 @@ def assist_removal_cards(cards, max_list_items = None, outformat = 'console'):
                        +'|enchantment.* artifact.* creature'
                        +'|artifact.* enchantment.* creature'
                        +'|artifact.* creature.* enchantment)',
-                       map(str.lower, get_oracle_texts(c))))),
+                       get_card_texts(c)['stripped_lower']))),
         cards_removal_not_destroy_land))
     cards_removal_destroy_two = list(filter(lambda c: bool(list(
         search_strings(r'(destroy|exile) target (\w+ )?('
@@ -2985,28 +4552,28 @@ def assist_removal_cards(cards, max_list_items = None, outformat = 'console'):
                        +'|enchantment.* artifact'
                        +'|artifact.* enchantment'
                        +'|artifact.* creature)',
-                       map(str.lower, get_oracle_texts(c))))),
+                       get_card_texts(c)['stripped_lower']))),
         [c for c in cards_removal_not_destroy_land
          if c not in cards_removal_destroy_three]))
     cards_removal_destroy_creature = list(filter(lambda c: bool(list(
         search_strings(r'(destroy|exile) target (\w+ )?creature',
-                       map(str.lower, get_oracle_texts(c))))),
+                       get_card_texts(c)['stripped_lower']))),
         cards_removal_not_destroy_land))
     cards_removal_destroy_creature_no_sacrifice = list(filter(lambda c: bool(list(
         not_in_strings_exclude('as an additional cost to cast this spell, sacrifice a creature',
                                'sacrifice a creature or discard',
-                               map(str.lower, get_oracle_texts(c))))),
+                               get_card_texts(c)['stripped_lower']))),
         cards_removal_destroy_creature))
     cards_removal_destroy_creature_no_exclusion = list(filter(lambda c: bool(list(
         search_strings(r'([Dd]estroy|[Ee]xile) target creature( or \w+)?( an opponent controls)?\.',
-                       get_oracle_texts(c)))),
+                       get_card_texts(c)['stripped']))),
         cards_removal_destroy_creature_no_sacrifice))
     cards_removal_destroy_creature_exclusion = [
         c for c in cards_removal_destroy_creature
         if c not in cards_removal_destroy_creature_no_exclusion]
     cards_removal_destroy_enchantment = list(filter(lambda c: bool(list(
         search_strings(r'(destroy|exile) target (\w+ )?enchantment',
-                       map(str.lower, get_oracle_texts(c))))),
+                       get_card_texts(c)['stripped_lower']))),
         cards_removal_not_destroy_land))
     cards_removal_destroy_other = [
         c for c in cards_removal_not_destroy_land
@@ -3125,56 +4692,36 @@ def assist_disabling_cards(cards, max_list_items = None, outformat = 'console'):
     cards_disabling_selected = []
     cards_disabling = []
     if DISABLING_CARDS_REGEX:
-        for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_filtered = list(map(lambda t: (
-                t.replace("(This creature can't attack.)", '')
-                 .replace(card['name']+' becomes a Shapeshifter artifact creature '  # pylint: disable=cell-var-from-loop
-                          'with base power and toughness', '')),
-                oracle_texts))
-            if 'card_faces' in card:
-                for face in card['card_faces']:
-                    oracle_texts_filtered = list(map(lambda t: (
-                        t.replace("(This creature can't attack.)", '')
-                          .replace(face['name']+' becomes a Shapeshifter artifact creature'  # pylint: disable=cell-var-from-loop
-                                   ' with base power and toughness', '')),
-                        oracle_texts_filtered))
-            oracle_texts_low = list(map(str.lower, oracle_texts_filtered))
-            for regexp in DISABLING_CARDS_REGEX:
-                if (list(search_strings(regexp, oracle_texts_low))
-                        and not list(search_strings(DISABLING_CARDS_EXCLUDE_REGEX,
-                                                    oracle_texts_low))):
-                    cards_disabling.append(card)
-                    break
+        cards_disabling = [c for c in cards if 'disabling' in get_card_tags(c)]
 
     cards_disabling_creature_no_abilities = list(filter(
         lambda c: bool(list(search_strings(
             r"(activated abilities can't be activated|activated abilities of [^.]+ can't be activated)",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_disabling))
 
     cards_disabling_creature_cant_attack_or_block = list(filter(
         lambda c: bool(list(search_strings(
             r"creature can't (block|attack( or block)?)",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_disabling))
 
     cards_disabling_creature_tap = list(filter(
         lambda c: bool(list(search_strings(
             r"(creature doesn't untap|if enchanted creature is untapped, tap it)",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_disabling))
 
     cards_disabling_creature_phaseout = list(filter(
         lambda c: bool(list(search_strings(
             r"creature phases out",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_disabling))
 
     cards_disabling_creature_mutate = list(filter(
         lambda c: bool(list(search_strings(
             r"(base power and toughness \d/\d|enchanted \w+ (is|becomes) a )",
-            list(map(str.lower, get_oracle_texts(c)))))),
+            get_card_texts(c)['stripped_lower']))),
         cards_disabling))
 
     disabling_stats_data = {
@@ -3253,26 +4800,22 @@ def assist_wipe_cards(cards, max_list_items = None, outformat = 'console'):
     cards_wipe_by_feature = {}
     if WIPE_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for regexp in WIPE_CARDS_REGEX:
-                if (list(search_strings(regexp, oracle_texts_low))
-                        and not list(search_strings(WIPE_CARDS_EXCLUDE_REGEX,
-                                                    oracle_texts_low))):
-                    card_added = False
-                    for feature, regexes in WIPE_CARDS_BY_FEATURE_REGEX.items():
-                        for reg in regexes:
-                            if list(search_strings(reg, oracle_texts_low)):
-                                if feature not in cards_wipe_by_feature:
-                                    cards_wipe_by_feature[feature] = []
-                                cards_wipe_by_feature[feature].append(card)
-                                card_added = True
-                                break
-                    if not card_added:
-                        if no_feature not in cards_wipe_by_feature:
-                            cards_wipe_by_feature[no_feature] = []
-                        cards_wipe_by_feature[no_feature].append(card)
-                    break
+            if 'wipe' not in get_card_tags(card):
+                continue
+            oracle_texts_low = get_card_texts(card)['stripped_lower']
+            card_added = False
+            for feature, regexes in WIPE_CARDS_BY_FEATURE_REGEX.items():
+                for reg in regexes:
+                    if list(search_strings(reg, oracle_texts_low)):
+                        if feature not in cards_wipe_by_feature:
+                            cards_wipe_by_feature[feature] = []
+                        cards_wipe_by_feature[feature].append(card)
+                        card_added = True
+                        break
+            if not card_added:
+                if no_feature not in cards_wipe_by_feature:
+                    cards_wipe_by_feature[no_feature] = []
+                cards_wipe_by_feature[no_feature].append(card)
 
     cards_wipe_selected = []
     for feature in cards_wipe_by_feature:
@@ -3321,21 +4864,16 @@ def assist_no_pay_cards(cards, max_list_items = None, outformat = 'console'):
         print('DEBUG Analysing no pay card ...', file=sys.stderr)
         previous_exile = []
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for source, regexes in NO_PAY_CARDS_REGEX.items():
-                for regexp in regexes:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(NO_PAY_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if source == 'exile, other' and card in previous_exile:
-                            continue
-                        if source not in cards_no_pay:
-                            cards_no_pay[source] = []
-                        cards_no_pay[source].append(card)
-                        if source != 'exile, other':
-                            previous_exile.append(card)
-                        break
+            tags = get_card_tags(card)
+            for source in NO_PAY_CARDS_REGEX:
+                if 'no-pay/'+source in tags:
+                    if source == 'exile, other' and card in previous_exile:
+                        continue
+                    if source not in cards_no_pay:
+                        cards_no_pay[source] = []
+                    cards_no_pay[source].append(card)
+                    if source != 'exile, other':
+                        previous_exile.append(card)
 
     no_pay_stats_data = {'No pay cards (total)': sum(map(len, cards_no_pay.values()))}
     no_pay_output_data = {'No pay cards by source': {}}
@@ -3401,38 +4939,30 @@ def assist_graveyard_recursion_cards(cards, max_list_items = None, outformat = '
 
     cards_grav_recur = []
     if GRAVEYARD_RECURSION_CARDS_REGEX:
-        for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for regexp in GRAVEYARD_RECURSION_CARDS_REGEX:
-                if (list(search_strings(regexp, oracle_texts_low))
-                        and not list(search_strings(GRAVEYARD_RECURSION_CARDS_EXCLUDE_REGEX,
-                                                    oracle_texts_low))):
-                    cards_grav_recur.append(card)
-                    break
+        cards_grav_recur = [c for c in cards if 'graveyard-recursion' in get_card_tags(c)]
 
     cards_grav_recur_target_creature = list(filter(
-        lambda c: bool(list(in_strings('creature', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('creature', get_card_texts(c)['stripped_lower']))),
         cards_grav_recur))
     cards_grav_recur_target_creature_battlefield = list(filter(
-        lambda c: bool(list(in_strings('battlefield', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('battlefield', get_card_texts(c)['stripped_lower']))),
         cards_grav_recur_target_creature))
     cards_grav_recur_target_creature_hand = list(filter(
-        lambda c: bool(list(in_strings('hand', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('hand', get_card_texts(c)['stripped_lower']))),
         [c for c in cards_grav_recur_target_creature
          if c not in cards_grav_recur_target_creature_battlefield]))
     cards_grav_recur_target_creature_library = list(filter(
-        lambda c: bool(list(in_strings('library', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('library', get_card_texts(c)['stripped_lower']))),
         [c for c in cards_grav_recur_target_creature
          if c not in cards_grav_recur_target_creature_battlefield
          and c not in cards_grav_recur_target_creature_hand]))
 
     cards_grav_recur_target_artifact = list(filter(
-        lambda c: bool(list(in_strings('artifact', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('artifact', get_card_texts(c)['stripped_lower']))),
         [c for c in cards_grav_recur if c not in cards_grav_recur_target_creature]))
 
     cards_grav_recur_target_instant_or_sorcery = list(filter(
-        lambda c: bool(list(search_strings('instant|sorcery', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(search_strings('instant|sorcery', get_card_texts(c)['stripped_lower']))),
         [c for c in cards_grav_recur if c not in cards_grav_recur_target_creature
          and c not in cards_grav_recur_target_artifact]))
 
@@ -3520,17 +5050,12 @@ def assist_graveyard_hate_cards(cards, max_list_items = None, outformat = 'conso
     cards_grav_hate = {}
     if GRAVEYARD_HATE_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for target, regexes in GRAVEYARD_HATE_CARDS_REGEX.items():
-                for regexp in regexes:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(GRAVEYARD_HATE_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if target not in cards_grav_hate:
-                            cards_grav_hate[target] = []
-                        cards_grav_hate[target].append(card)
-                        break
+            tags = get_card_tags(card)
+            for target in GRAVEYARD_HATE_CARDS_REGEX:
+                if 'graveyard-hate/'+target in tags:
+                    if target not in cards_grav_hate:
+                        cards_grav_hate[target] = []
+                    cards_grav_hate[target].append(card)
 
     grav_hate_stats_data = {'Graveyard hate cards (total)': sum(map(len, cards_grav_hate.values()))}
     grav_hate_output_data = {'Graveyard hate cards by target': {}}
@@ -3594,38 +5119,16 @@ def assist_copy_cards(cards, max_list_items = None, outformat = 'console'):
 
     cards_copy = []
     if COPY_CARDS_REGEX:
-        for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_filtered = list(map(lambda t: (
-                t.replace("its controller may cast a copy of the encoded card without paying its mana cost", '')
-                 .replace("(Create a token that's a copy of a creature token you control.)", '')
-                 .replace('copy it and you may choose a new target for the copy', '')
-                 .replace("create a token that's a copy of this creature that's tapped and attacking that player", '')),
-                oracle_texts))
-            if 'card_faces' in card:
-                for face in card['card_faces']:
-                    oracle_texts_filtered = list(map(lambda t: (
-                        t.replace("its controller may cast a copy of the encoded card without paying its mana cost", '')
-                         .replace("(Create a token that's a copy of a creature token you control.)", '')
-                         .replace('copy it and you may choose a new target for the copy', '')
-                         .replace("create a token that's a copy of this creature that's tapped and attacking that player", '')),
-                        oracle_texts_filtered))
-            oracle_texts_low = list(map(str.lower, oracle_texts_filtered))
-            for regexp in COPY_CARDS_REGEX:
-                if (list(search_strings(regexp, oracle_texts_low))
-                        and not list(search_strings(COPY_CARDS_EXCLUDE_REGEX,
-                                                    oracle_texts_low))):
-                    cards_copy.append(card)
-                    break
+        cards_copy = [c for c in cards if 'copy' in get_card_tags(c)]
 
     cards_copy_target_creature = list(filter(
-        lambda c: bool(list(in_strings('creature', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('creature', get_card_texts(c)['stripped_lower']))),
         cards_copy))
     cards_copy_target_creature_graveyard = list(filter(
-        lambda c: bool(list(in_strings('graveyard', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('graveyard', get_card_texts(c)['stripped_lower']))),
         cards_copy_target_creature))
     cards_copy_target_creature_hand = list(filter(
-        lambda c: bool(list(in_strings('hand', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('hand', get_card_texts(c)['stripped_lower']))),
         [c for c in cards_copy_target_creature
          if c not in cards_copy_target_creature_graveyard]))
     cards_copy_target_creature_battlefield = [
@@ -3634,11 +5137,11 @@ def assist_copy_cards(cards, max_list_items = None, outformat = 'console'):
         and c not in cards_copy_target_creature_hand]
 
     cards_copy_target_artifact = list(filter(
-        lambda c: bool(list(in_strings('artifact', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(in_strings('artifact', get_card_texts(c)['stripped_lower']))),
         [c for c in cards_copy if c not in cards_copy_target_creature]))
 
     cards_copy_target_instant_or_sorcery = list(filter(
-        lambda c: bool(list(search_strings('instant|sorcery', list(map(str.lower, get_oracle_texts(c)))))),
+        lambda c: bool(list(search_strings('instant|sorcery', get_card_texts(c)['stripped_lower']))),
         [c for c in cards_copy if c not in cards_copy_target_creature
          and c not in cards_copy_target_artifact]))
 
@@ -3761,8 +5264,7 @@ def assist_selfimproving_creature_cards(cards, max_list_items = None, outformat
         if skip:
             continue
 
-        oracle_texts = get_oracle_texts(card, replace_name = '<name>')
-        oracle_texts_low = list(map(str.lower, oracle_texts))
+        oracle_texts_low = list(get_card_texts(card)['named_lower'])
         add = False
         for feature, regexes in selfimproving_regexes.items():
             for regex in regexes:
@@ -3960,6 +5462,20 @@ def assist_creature_effects(cards, max_list_items = None, outformat = 'console')
          r'-1/-1 until end of turn\.'),
         ]
 
+    # regexes of each feature for each target, and their excluding prefixes
+    features_targets_regexes = {}
+    for feature, feature_regex in features.items():
+        for target, target_regex in target_regexes.items():
+            # TODO handle those with two features
+            # obtain = '(gains?|gets?|have|has)'
+            # if 'loses?' in target_regex:
+            #     obtain = 'loses?'
+            # regex = target_regex+' ([^.]+ and '+obtain+' )?('+feature_regex+')'
+            regex = target_regex+' ('+feature_regex+')'
+            exclude_regex = '('+('|'.join(exclude_prefixes))+r')\s*'+regex
+            features_targets_regexes[(feature, target)] = (get_regex(regex),
+                                                           get_regex(exclude_regex))
+
     cards_creature_effects = {}
     for card in cards:
 
@@ -3977,22 +5493,15 @@ def assist_creature_effects(cards, max_list_items = None, outformat = 'console')
         if skip:
             continue
 
-        oracle_texts = get_oracle_texts(card)
-        oracle_texts_low = list(map(str.lower, oracle_texts))
+        oracle_texts_low = list(get_card_texts(card)['stripped_lower'])
 
         added = False
         skipped_for_target = {}
-        for feature, feature_regex in features.items():
-            for target, target_regex in target_regexes.items():
+        for feature in features:
+            for target in target_regexes:
                 if target not in skipped_for_target:
                     skipped_for_target[target] = False
-                # TODO handle those with two features
-                # obtain = '(gains?|gets?|have|has)'
-                # if 'loses?' in target_regex:
-                #     obtain = 'loses?'
-                # regex = target_regex+' ([^.]+ and '+obtain+' )?('+feature_regex+')'
-                regex = target_regex+' ('+feature_regex+')'
-                exclude_regex = '('+('|'.join(exclude_prefixes))+r')\s*'+regex
+                regex, exclude_regex = features_targets_regexes[(feature, target)]
                 if (list(search_strings(regex, oracle_texts_low))
                         and not list(search_strings(exclude_regex, oracle_texts_low))):
                     skip = False
@@ -4131,14 +5640,15 @@ def assist_best_creature_cards(cards, max_list_items = None, outformat = 'consol
                         feature = 'Flying'
                     # TODO evasion cards (except flying)
 
-                defender = ('Defender' if bool(re.search('(^|[,.] )Defender', face_text))
+                defender = ('Defender' if bool(regex_search('(^|[,.] )Defender', face_text))
                             else 'not Defender')
 
                 malus = 'no malus'
                 if face_text:
+                    # the regexes refer to the face by '<name>'
+                    face_text_named = face_text.replace(face['name'], '<name>')
                     for regexp in CREATURE_MALUS_REGEXES:
-                        reg = regexp.replace('<name>', face['name'])
-                        if bool(re.search(reg, face_text)):
+                        if bool(regex_search(regexp, face_text_named)):
                             malus = 'malus'
                             break
 
@@ -4496,17 +6006,12 @@ def assist_counterspell(cards, max_list_items = None, outformat = 'console'):
     cards_counterspell_by_feature = {}
     if COUNTERSPELL_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for feature, regexp_list in COUNTERSPELL_CARDS_REGEX.items():
-                for regexp in regexp_list:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(COUNTERSPELL_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if feature not in cards_counterspell_by_feature:
-                            cards_counterspell_by_feature[feature] = []
-                        cards_counterspell_by_feature[feature].append(card)
-                        break
+            tags = get_card_tags(card)
+            for feature in COUNTERSPELL_CARDS_REGEX:
+                if 'counterspell/'+feature in tags:
+                    if feature not in cards_counterspell_by_feature:
+                        cards_counterspell_by_feature[feature] = []
+                    cards_counterspell_by_feature[feature].append(card)
 
     features = list(filter(lambda f: f in cards_counterspell_by_feature,
                            COUNTERSPELL_CARDS_REGEX.keys()))
@@ -4575,17 +6080,12 @@ def assist_cannotbecountered(cards, max_list_items = None, outformat = 'console'
     cards_cannotbecountered_by_feature = {}
     if CANNOTBECOUNTERED_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for feature, regexp_list in CANNOTBECOUNTERED_CARDS_REGEX.items():
-                for regexp in regexp_list:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(CANNOTBECOUNTERED_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if feature not in cards_cannotbecountered_by_feature:
-                            cards_cannotbecountered_by_feature[feature] = []
-                        cards_cannotbecountered_by_feature[feature].append(card)
-                        break
+            tags = get_card_tags(card)
+            for feature in CANNOTBECOUNTERED_CARDS_REGEX:
+                if 'cannot-be-countered/'+feature in tags:
+                    if feature not in cards_cannotbecountered_by_feature:
+                        cards_cannotbecountered_by_feature[feature] = []
+                    cards_cannotbecountered_by_feature[feature].append(card)
 
     features = list(filter(lambda f: f in cards_cannotbecountered_by_feature,
                            CANNOTBECOUNTERED_CARDS_REGEX.keys()))
@@ -4654,17 +6154,12 @@ def assist_cannotattack(cards, max_list_items = None, outformat = 'console'):
     cards_cannotattack_by_feature = {}
     if CANNOTATTACK_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for feature, regexp_list in CANNOTATTACK_CARDS_REGEX.items():
-                for regexp in regexp_list:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(CANNOTATTACK_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if feature not in cards_cannotattack_by_feature:
-                            cards_cannotattack_by_feature[feature] = []
-                        cards_cannotattack_by_feature[feature].append(card)
-                        break
+            tags = get_card_tags(card)
+            for feature in CANNOTATTACK_CARDS_REGEX:
+                if 'cannot-attack/'+feature in tags:
+                    if feature not in cards_cannotattack_by_feature:
+                        cards_cannotattack_by_feature[feature] = []
+                    cards_cannotattack_by_feature[feature].append(card)
 
     features = list(filter(lambda f: f in cards_cannotattack_by_feature,
                            CANNOTATTACK_CARDS_REGEX.keys()))
@@ -4733,17 +6228,12 @@ def assist_cannotcastspell(cards, max_list_items = None, outformat = 'console'):
     cards_cannotcastspell_by_feature = {}
     if CANNOTCASTSPELL_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for feature, regexp_list in CANNOTCASTSPELL_CARDS_REGEX.items():
-                for regexp in regexp_list:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(CANNOTCASTSPELL_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if feature not in cards_cannotcastspell_by_feature:
-                            cards_cannotcastspell_by_feature[feature] = []
-                        cards_cannotcastspell_by_feature[feature].append(card)
-                        break
+            tags = get_card_tags(card)
+            for feature in CANNOTCASTSPELL_CARDS_REGEX:
+                if 'cannot-cast-spell/'+feature in tags:
+                    if feature not in cards_cannotcastspell_by_feature:
+                        cards_cannotcastspell_by_feature[feature] = []
+                    cards_cannotcastspell_by_feature[feature].append(card)
 
     features = list(filter(lambda f: f in cards_cannotcastspell_by_feature,
                            CANNOTCASTSPELL_CARDS_REGEX.keys()))
@@ -4816,17 +6306,12 @@ def assist_preventdamage(cards, max_list_items = None, outformat = 'console'):
     cards_preventdamage_by_feature = {}
     if PREVENTDAMAGE_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for feature, regexp_list in PREVENTDAMAGE_CARDS_REGEX.items():
-                for regexp in regexp_list:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(PREVENTDAMAGE_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if feature not in cards_preventdamage_by_feature:
-                            cards_preventdamage_by_feature[feature] = []
-                        cards_preventdamage_by_feature[feature].append(card)
-                        break
+            tags = get_card_tags(card)
+            for feature in PREVENTDAMAGE_CARDS_REGEX:
+                if 'prevent-damage/'+feature in tags:
+                    if feature not in cards_preventdamage_by_feature:
+                        cards_preventdamage_by_feature[feature] = []
+                    cards_preventdamage_by_feature[feature].append(card)
 
     features = list(filter(lambda f: f in cards_preventdamage_by_feature,
                            PREVENTDAMAGE_CARDS_REGEX.keys()))
@@ -4895,17 +6380,12 @@ def assist_gaincontrol(cards, max_list_items = None, outformat = 'console'):
     cards_gaincontrol_by_feature = {}
     if GAINCONTROL_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for feature, regexp_list in GAINCONTROL_CARDS_REGEX.items():
-                for regexp in regexp_list:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(GAINCONTROL_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if feature not in cards_gaincontrol_by_feature:
-                            cards_gaincontrol_by_feature[feature] = []
-                        cards_gaincontrol_by_feature[feature].append(card)
-                        break
+            tags = get_card_tags(card)
+            for feature in GAINCONTROL_CARDS_REGEX:
+                if 'gain-control/'+feature in tags:
+                    if feature not in cards_gaincontrol_by_feature:
+                        cards_gaincontrol_by_feature[feature] = []
+                    cards_gaincontrol_by_feature[feature].append(card)
 
     features = list(filter(lambda f: f in cards_gaincontrol_by_feature,
                            GAINCONTROL_CARDS_REGEX.keys()))
@@ -4918,8 +6398,7 @@ def assist_gaincontrol(cards, max_list_items = None, outformat = 'console'):
         cards_gaincontrol_by_feature[feature] = [
             c for c in cards_gaincontrol_by_feature[feature] if c not in prev_feature_cards]
         for card in cards_gaincontrol_by_feature[feature]:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
+            oracle_texts_low = list(get_card_texts(card)['stripped_lower'])
             for regexp in GAINCONTROL_CARDS_REGEX[feature]:
                 reg = regexp + (r'[^.]+('
                     #+r'for as long as (you control [^.]+|[^.]+ remains on the battlefield)'
@@ -5022,17 +6501,12 @@ def assist_protect(cards, max_list_items = None, outformat = 'console'):
     cards_protect_by_feature = {}
     if PROTECT_CARDS_REGEX:
         for card in cards:
-            oracle_texts = list(get_oracle_texts(card))
-            oracle_texts_low = list(map(str.lower, oracle_texts))
-            for feature, regexp_list in PROTECT_CARDS_REGEX.items():
-                for regexp in regexp_list:
-                    if (list(search_strings(regexp, oracle_texts_low))
-                            and not list(search_strings(PROTECT_CARDS_EXCLUDE_REGEX,
-                                                        oracle_texts_low))):
-                        if feature not in cards_protect_by_feature:
-                            cards_protect_by_feature[feature] = []
-                        cards_protect_by_feature[feature].append(card)
-                        break
+            tags = get_card_tags(card)
+            for feature in PROTECT_CARDS_REGEX:
+                if 'protect/'+feature in tags:
+                    if feature not in cards_protect_by_feature:
+                        cards_protect_by_feature[feature] = []
+                    cards_protect_by_feature[feature].append(card)
 
     features = list(filter(lambda f: f in cards_protect_by_feature,
                            PROTECT_CARDS_REGEX.keys()))
@@ -5145,12 +6619,7 @@ def print_tup_combo(tup_combo, cards, indent = 0, print_header = False, max_card
             # TODO get card from the combo card list
             card = get_card(name, cards, strict = True)
             # TODO display both faces
-            imgurl = ''
-            if 'image_uris' in card and 'normal' in card['image_uris']:
-                imgurl = card['image_uris']['normal']
-            elif ('card_faces' in card and card['card_faces'] and 'image_uris' in card['card_faces'][0]
-                and 'normal' in card['card_faces'][0]['image_uris']):
-                imgurl = card['card_faces'][0]['image_uris']['normal']
+            imgurl = get_card_html_image_url(card)
             img_element = '<img src="#" data-imgurl="'+imgurl+'" alt="image of card '+name.replace('"', '&quot;')+'" />'
             if not imgurl:
                 img_element = '<span class="card-not-found">/<span>'
@@ -5232,18 +6701,42 @@ def print_tup_combo(tup_combo, cards, indent = 0, print_header = False, max_card
 
     return ret
 
+def get_cards_index(cards):
+    """Return the index of a list of cards objects (built once per list, see 'CARDS_INDEXES'),
+       a dict with the following keys:
+           cards      list       the cards indexed
+           names      dict       card name -> tuple(position of the first one, card)
+           faces      dict       face name -> tuple(position of the first one, card, face)
+           all_names  frozenset  the names of the cards and of their faces
+    """
+    index = CARDS_INDEXES.get(id(cards))
+    if index and index['cards'] is cards and index['count'] == len(cards):
+        return index
+    index = {'cards': cards, 'count': len(cards), 'names': {}, 'faces': {}}
+    for position, card in enumerate(cards):
+        if card['name'] not in index['names']:
+            index['names'][card['name']] = (position, card)
+        if 'card_faces' in card:
+            for face in card['card_faces']:
+                if face['name'] not in index['faces']:
+                    index['faces'][face['name']] = (position, card, face)
+    index['all_names'] = frozenset(index['names']) | frozenset(index['faces'])
+    if len(CARDS_INDEXES) >= CARDS_INDEXES_MAX:
+        del CARDS_INDEXES[next(iter(CARDS_INDEXES))]
+    CARDS_INDEXES[id(cards)] = index
+    return index
+
 def get_card(name, cards, return_face = False, strict = False):
     """Find a card by its name in a list of cards objects
        (if return_face use faces instead of cards)"""
-    for card in cards:
-        if card['name'] == name:
-            return card
-        if not strict and 'card_faces' in card:
-            for face in card['card_faces']:
-                if face['name'] == name:
-                    if return_face:
-                        return face
-                    return card
+    index = get_cards_index(cards)
+    by_name = index['names'].get(name)
+    by_face = index['faces'].get(name) if not strict else None
+    # like a scan of the list: the first card whose name or one of its faces name matches
+    if by_face and (not by_name or by_face[0] < by_name[0]):
+        return by_face[2] if return_face else by_face[1]
+    if by_name:
+        return by_name[1]
     return None
 
 def names_to_cards(names, cards, return_face = False):
@@ -5251,26 +6744,58 @@ def names_to_cards(names, cards, return_face = False):
     return list(map(lambda n: get_card(n, cards, return_face), names))
 
 def get_combos(combos, cards, name = None, only_ok = True, combo_res_regex = None,
-               max_cards = None, min_cards = 2, excludes = None):
+               max_cards = None, min_cards = 2, excludes = None, color_identity = None):
     """Return a dict containing:
          -   key: a tuple of cards comboting together
-         - value: a dict with keys: 'infos' the combo infos, 'cards' the combo's cards
+         - value: an immutable dict with keys: 'infos' the combo record (see
+                  'make_combo_record()'), 'cards' the combo's cards, and the CMC stats (see
+                  'analyse_combo()'), computed once per cards list
 
        Parameters:
-           name             string   a card name to match combo against
+           name             string   a card name to match combo against (contained in the
+                                     name of one of the combo's cards, like a card's face in
+                                     a double faced card name)
            only_ok          boolean  if 'True' ensure all combo's card belong to the given list
            cards            list     the list of cards to search in
            combo_res_regex  string   if not None add combo only if its effect matches this regex
            max_cards        int      only consider combos with at most this number of cards
            min_cards        int      only consider combos with at least this number of cards
            excludes         list     a list of tuple of card names to exclude
+           color_identity   set      if not None only consider combos within that color
+                                     identity (when their color identity is known)
+
+       The combos could also be a combos store (see 'build_combos_store()') or a connection to
+       the SQLite combos database (see 'get_commanderspellbook_combos_db()'), then only the
+       matching combos are extracted.
     """
+    cards_index = get_cards_index(cards)
+    # names of the cards (and faces) available, to discard combos before resolving their cards
+    available_names = cards_index['all_names'] if only_ok else None
+    # combos already resolved against that cards list: combo id -> (record, value or None)
+    resolved_combos = cards_index.setdefault('combos', {})
+    invalid_mask = None
+    if color_identity is not None:
+        invalid_mask = get_color_identity_mask(ALL_COLORS - set(color_identity))
+    if isinstance(combos, sqlite3.Connection):
+        combos = query_commanderspellbook_combos_db(
+            combos, name = name, available_names = available_names,
+            combo_res_regex = combo_res_regex, max_cards = max_cards, min_cards = min_cards,
+            excludes = excludes)
+    elif is_combos_store(combos):
+        combos = query_combos_store(
+            combos, name = name, available_names = available_names,
+            combo_res_regex = combo_res_regex, max_cards = max_cards, min_cards = min_cards,
+            excludes = excludes, color_identity = color_identity)
     card_combos = {}
     for combo_id, combo in combos.items():
-        card_names = tuple(sorted(combo['c'])) if 'c' in combo and combo['c'] else tuple()
         if not combo_id or (excludes and combo_id in excludes):
             continue
-        add_combo = (not name or any(filter(lambda names: name in names, card_names))
+        if not isinstance(combo, MappingProxyType):
+            combo = make_combo_record(combo)
+        if invalid_mask and combo['color_identity'] and combo['color_identity'] & invalid_mask:
+            continue
+        card_names = combo['c']
+        add_combo = ((not name or any(name in card_name for card_name in card_names))
                      and combo_id not in card_combos)
         if add_combo:
             if ((max_cards and len(card_names) > max_cards)
@@ -5280,22 +6805,30 @@ def get_combos(combos, cards, name = None, only_ok = True, combo_res_regex = Non
                 print('Warning: skipping following combo because it only has 1 card.',
                       card_names, file=sys.stderr)
                 continue
-            combo_cards = names_to_cards(card_names, cards, return_face = True)
-            combo_cards_not_found = any(map(lambda c: c is None, combo_cards))
-            if combo_cards_not_found:
+            if available_names is not None and not available_names.issuperset(card_names):
+                continue
+            if combo_res_regex and not (combo['r_lower']
+                    and re.search(combo_res_regex, combo['r_lower'])):
+                continue
+            if combo_id not in resolved_combos or resolved_combos[combo_id][0] is not combo:
+                combo_value = None
+                combo_cards = names_to_cards(card_names, cards, return_face = True)
+                if not any(map(lambda c: c is None, combo_cards)):
+                    combo_value = MappingProxyType(analyse_combo(
+                        {'infos': combo, 'cards': tuple(sort_cards_by_cmc_and_name(combo_cards))}))
+                resolved_combos[combo_id] = (combo, combo_value)
+            combo_value = resolved_combos[combo_id][1]
+            if not combo_value:
                 if only_ok:
                     continue
                 print('Warning: skipping following combo because of card not found.',
                       card_names, file=sys.stderr)
                 continue
-            if combo_res_regex and not (combo['r']
-                    and re.search(combo_res_regex, combo['r'].lower())):
-                continue
             if name:
-                combo['c'] = tuple((name, *(sorted(set(card_names) - {name}))))
-            card_combos[combo_id] = {'infos': combo,
-                                     'cards': sort_cards_by_cmc_and_name(combo_cards)}
-            analyse_combo(card_combos[combo_id])
+                # the card specified first, without altering the shared combo record
+                combo_value = MappingProxyType(combo_value | {'infos': MappingProxyType(
+                    combo | {'c': tuple((name, *(sorted(set(card_names) - {name}))))})})
+            card_combos[combo_id] = combo_value
     return card_combos
 
 def get_nx_graph(cards_relations):
@@ -5349,7 +6882,8 @@ def export_gexf(cards_relations):
                 +"\t"+'<graph defaultedgetype="undirected" idtype="string" type="static">'+"\n"
                 +"\t"+"\t"+'<nodes count="'+str(len(cards_relations))+'">"'+"\n")
     card_ids = {}
-    with open('/tmp/combo_cards.gexf', 'w', encoding='utf-8') as f_write:
+    with open(pjoin(get_cache_dir('exports'), 'combo_cards.gexf'), 'w',
+              encoding='utf-8') as f_write:
         f_write.write(xml_header)
         card_id = 0.0
         for name in cards_relations:
@@ -5450,7 +6984,8 @@ def assist_k_core_combos(combos, cards, regex, num_cards, excludes, max_cards =
     print('DEBUG Searching for all', num_cards, 'cards combos with', regex, "...",
           'Please wait up to '+str(num_cards - 1)+' minute(s) ...', flush=True, file=sys.stderr)
     new_combos = get_combos(combos, cards, max_cards = num_cards, min_cards = num_cards,
-                            combo_res_regex = regex, excludes = excludes)
+                            combo_res_regex = regex, excludes = excludes,
+                            color_identity = COMMANDER_COLOR_IDENTITY)
 
     # TODO use a graph of combos:
     #       - with weighted edges for percentage of shared cards
@@ -6271,7 +7806,7 @@ def get_html_toc(cssclass = '', show_deck_info = False):
     html += '        </nav>'+'\n'
     return html
 
-def display_commander_card(card, commander_combos_regex, outformat = 'console', outdir = '/tmp'):
+def display_commander_card(card, commander_combos_regex, outformat = 'console', outdir = None):
     """Display the commander card and extracted attributes/features"""
 
     commander_color_name = get_card_colored(card)
@@ -6279,12 +7814,7 @@ def display_commander_card(card, commander_combos_regex, outformat = 'console',
     # html
     if outformat == 'html':
 
-        imgurl = ''
-        if 'image_uris' in card and 'normal' in card['image_uris']:
-            imgurl = card['image_uris']['normal']
-        elif ('card_faces' in card and card['card_faces'] and 'image_uris' in card['card_faces'][0]
-              and 'normal' in card['card_faces'][0]['image_uris']):
-            imgurl = card['card_faces'][0]['image_uris']['normal']
+        imgurl = get_card_html_image_url(card)
 
         html = ''
         html += '  <h2 id="commander-card">Commander</h2>'+'\n'
@@ -6324,7 +7854,9 @@ def display_commander_card(card, commander_combos_regex, outformat = 'console',
         # image
         imgpath, imgwidth, imgheight = None, None, None
         if USE_SIXEL and sys.stdout.isatty():
-            imgpath, imgwidth, imgheight = get_card_image(card, imgformat = 'normal', outdir = outdir)
+            image = get_card_image(card, imgformat = 'normal', outdir = outdir)
+            if image:
+                imgpath, imgwidth, imgheight = image
 
         print('')
         print('')
@@ -6332,7 +7864,7 @@ def display_commander_card(card, commander_combos_regex, outformat = 'console',
         print('')
 
         # display image (if terminal is sixel compatible, see https://www.arewesixelyet.com)
-        if USE_SIXEL and sys.stdout.isatty():  # in a terminal
+        if USE_SIXEL and sys.stdout.isatty() and imgpath:  # in a terminal
             extraopts = {}
             if imgwidth is not None and imgheight is not None:
                 extraopts['w'] = imgwidth
@@ -6408,7 +7940,8 @@ def assist_commander_combos(commander_combos_no_filter, commander_combos, comman
 
         if commander_combos_regex:
             commander_combos_filtered = get_combos(combos, cards, name = COMMANDER_NAME,
-                                                   combo_res_regex = commander_combos_regex)
+                                                   combo_res_regex = commander_combos_regex,
+                                                   color_identity = COMMANDER_COLOR_IDENTITY)
             if commander_combos_filtered:
                 c_combos = commander_combos_filtered
             else:
@@ -6459,7 +7992,8 @@ def assist_commander_combos(commander_combos_no_filter, commander_combos, comman
                 file=sys.stderr)
             card_combos = get_combos(combos, cards, name = card_name,
                                      combo_res_regex = commander_combos_regex,
-                                     excludes = combos_rank_2_excludes)
+                                     excludes = combos_rank_2_excludes,
+                                     color_identity = COMMANDER_COLOR_IDENTITY)
             if card_combos:
                 for c_id, c_info in card_combos.items():
                     if c_id not in combos_rank_2:
@@ -6727,8 +8261,7 @@ def assist_commander_keywords_common(commander_card, cards, limit = None, outfor
     associated_feature_organized = {}
     if COMMANDER_FEATURES_REGEXES:
         commander_common_feature = {}
-        commander_texts = get_oracle_texts(commander_card)
-        commander_texts_low = list(map(str.lower, commander_texts))
+        commander_texts_low = list(get_card_texts(commander_card)['lower'])
         for feature, have_and_search in COMMANDER_FEATURES_REGEXES.items():
             for have_regexp, search_regexp in have_and_search.items():
                 if list(search_strings(have_regexp, commander_texts_low)):
@@ -6737,8 +8270,7 @@ def assist_commander_keywords_common(commander_card, cards, limit = None, outfor
                     if not search_regexp:
                         continue
                     for card in cards:
-                        oracle_texts = get_oracle_texts(card, replace_name = '<name>')
-                        oracle_texts_low = list(map(str.lower, oracle_texts))
+                        oracle_texts_low = list(get_card_texts(card)['named_lower'])
                         for regexp in search_regexp:
                             exclude_regexes = []
                             if isinstance(regexp, tuple):
@@ -6794,8 +8326,7 @@ def assist_commander_keywords_common(commander_card, cards, limit = None, outfor
                                 if not search_regexp:
                                     continue
                                 for card in cards:
-                                    oracle_texts = get_oracle_texts(card, replace_name = '<name>')
-                                    oracle_texts_low = list(map(str.lower, oracle_texts))
+                                    oracle_texts_low = list(get_card_texts(card)['named_lower'])
                                     for regexp in search_regexp:
                                         exclude_regexes = []
                                         if isinstance(regexp, tuple):
@@ -6981,7 +8512,6 @@ def compare_with_hand_crafted_list(selection, list_file, title, cards):
                         no_print = True
                         break
             if not no_print and card and not filter_lands(card):
-                oracle_texts_low = list(map(str.lower, get_oracle_texts(card)))
                 # if (bool(list(in_strings('graveyard', oracle_texts_low))) or
                 #         bool(list(in_strings('counter', oracle_texts_low)))):
                 #     bad_misses.append(card)
@@ -7048,6 +8578,9 @@ def main():
     global XMAGE_COMMANDER_CARDS_BANNED
     global TERM_COLS
     global TERM_LINES
+    global CACHE_MAX_BYTES
+    global STORAGE_CODEC
+    global HTML_IMAGES_DIR
     global colored
 
     parser = ArgumentParser(
@@ -7065,12 +8598,16 @@ def main():
                              "default to '(win|lose|damage)')")
     parser.add_argument('-l', '--list-combos-effects', action='store_true',
                         help='list combos effects')
+    parser.add_argument('--combos-db', action='store_true',
+                        help='query the combos from a SQLite database (built from the combos '
+                             'downloaded) instead of loading them all in memory')
     parser.add_argument('-m', '--max-list-items', type=int, default=10,
                         help='limit listing to that number of items (default to 10)')
     parser.add_argument('-o', '--output', default=sys.stdout,
                         help='output to this file (default to stdout)')
-    parser.add_argument('-d', '--outdir', default='/tmp',
-                        help='output to this directory (default to /tmp)')
+    parser.add_argument('-d', '--outdir',
+                        help="download images to this directory (default to the cache 'images' "
+                             'directory)')
     rules0_default = ['no-expensive', 'with-xmage-banned', 'no-stickers', 'no-alpha-bilands']
     parser.add_argument('-0', '--rules0', nargs='*', default=rules0_default,
                         help="rules 0 preset (default to '"+(' '.join(rules0_default))+"')")
@@ -7078,6 +8615,28 @@ def main():
     parser.add_argument('-x', '--exclude', nargs='*', default=['set:LTR', 'set:SWS'],
                         help="exclude Sets or Cards (default to: 'set:LTR|set:SWS')")
     parser.add_argument('--html', action='store_true', help='output format to an HTML page')
+    parser.add_argument('-b', '--background-refresh', action='store_true',
+                        help='use the local data right away, and refresh it in background for the '
+                             'next run')
+    parser.add_argument('--prefetch-images', action='store_true',
+                        help="download the images of the commander and of the cards selected (to the outdir), "
+                             "the HTML output showing these local images")
+    parser.add_argument('--regex-stats', action='store_true',
+                        help='print the search statistics of the regexes (searches, hits and time '
+                             'by pattern) to stderr, at the end')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help="print the cache statistics (directory: '"+CACHE_DIR+"') and exit")
+    parser.add_argument('--cache-max-size', type=int, default=int(CACHE_MAX_BYTES / 1024 / 1024),
+                        help='maximum size of the cache in MB, least recently used files being '
+                             'removed above it (default to '
+                             +str(int(CACHE_MAX_BYTES / 1024 / 1024))+')')
+    parser.add_argument('--storage-codec', default=STORAGE_CODEC,
+                        choices=['auto'] + list(STORAGE_CODECS.keys()),
+                        help='compression of the cards and combos databases stored in the cache '
+                             "('auto' selects the fastest available, default to '"
+                             +STORAGE_CODEC+"')")
+    parser.add_argument('--refresh-data', action='store_true',
+                        help='refresh the local data (combos, cards, banned lists) and exit')
     # TODO Add a parameter to prevent cards comparison with hand crafted list
     args = parser.parse_args()
 
@@ -7096,6 +8655,23 @@ def main():
         print('')
         sys.exit(0)
 
+    CACHE_MAX_BYTES = args.cache_max_size * 1024 * 1024
+    STORAGE_CODEC = args.storage_codec
+
+    try:
+        make_cache_dir()
+    except PermissionError as err:
+        print('Error:', err, file=sys.stderr)
+        sys.exit(1)
+
+    if args.cache_stats:
+        print_cache_stats()
+        sys.exit(0)
+
+    if args.refresh_data:
+        refresh_data()
+        sys.exit(0)
+
     if args.list_combos_effects and args.html:
         print("Error: option '--list-combos-effects' and '--html' are mutualy exclusive "
               "(choose only one)", file=sys.stderr)
@@ -7112,25 +8688,19 @@ def main():
     if sys.stdout.isatty():  # in a terminal
         TERM_COLS, TERM_LINES = os.get_terminal_size()
 
-    # combo
-    combos = get_commanderspellbook_combos()
-    print('DEBUG Loaded combos database:', len(combos), 'combos', file=sys.stderr)
+    if args.background_refresh:
+        start_background_data_refresh()
 
+    # combo
     commander_combos_regex = '|'.join(args.combo) if args.combo else None
-    combos_effects = {}
+    combos_effects = get_commanderspellbook_combos_effects_index(
+        offline = args.background_refresh)['counts']
+    print('DEBUG Loaded combos effects index:', len(combos_effects), 'effects', file=sys.stderr)
     combos_effects_matches = []
-    for combo in combos.values():
-        if 'r' in combo and combo['r']:
-            for line in combo['r'].replace('. ', '\n').replace('..', '.').split('\n'):
-                line_normalized = combo_effect_normalize(line)
-                if line_normalized:
-                    if (commander_combos_regex
-                            and re.search(commander_combos_regex, line_normalized)
-                            and line_normalized not in combos_effects_matches):
-                        combos_effects_matches.append(line_normalized)
-                    if line_normalized not in combos_effects:
-                        combos_effects[line_normalized] = 0
-                    combos_effects[line_normalized] += 1
+    if commander_combos_regex:
+        # evaluated once per distinct effect
+        combos_effects_matches = [effect for effect in combos_effects
+                                  if re.search(commander_combos_regex, effect)]
 
     if commander_combos_regex and not combos_effects_matches:
         print("Warning: no combo effect found matching specified argument '"+
@@ -7160,22 +8730,42 @@ def main():
                 print('')
                 break
             print(f'   {count:>6}  {effect}')
+        cache_evict()
         sys.exit(0)
 
+    if args.combos_db:
+        combos = get_commanderspellbook_combos_db(offline = args.background_refresh)
+        print('DEBUG Opened combos SQLite database:',
+              combos.execute('SELECT count(*) FROM combos').fetchone()[0], 'combos',
+              file=sys.stderr)
+    else:
+        combos = build_combos_store(get_commanderspellbook_combos(
+            offline = args.background_refresh))
+        print('DEBUG Loaded combos database:', len(combos['ids']), 'combos', file=sys.stderr)
+
     COMMANDER_NAME = args.commander_name
 
     input_deck_cards_names = []
     if args.input_deck_file:
         input_deck_cards_names = get_input_deck_cards(args.input_deck_file)
 
-    XMAGE_COMMANDER_CARDS_BANNED = get_xmage_commander_banned_list()
+    XMAGE_COMMANDER_CARDS_BANNED = get_xmage_commander_banned_list(
+        offline = args.background_refresh)
 
     # get scryfall cards database
     cards = None
-    scryfall_bulk_data = get_scryfall_bulk_data()
-    scryfall_cards_db_json_file = get_scryfall_cards_db(scryfall_bulk_data)
-    with open(scryfall_cards_db_json_file, "r", encoding="utf8") as r_file:
-        cards = json.load(r_file)
+    scryfall_bulk_data = get_scryfall_bulk_data(offline = args.background_refresh)
+    scryfall_cards_db_json_file = get_scryfall_cards_db(scryfall_bulk_data,
+                                                        offline = args.background_refresh)
+    cards = get_scryfall_cards_snapshot(scryfall_cards_db_json_file,
+                                        offline = args.background_refresh)
+    # derive the texts of every card once, for all the assists
+    for card in cards:
+        get_card_texts(card)
+    # categories tags of every card, commander independent (see 'get_card_tags()')
+    get_scryfall_cards_tags(cards, scryfall_cards_db_json_file)
+    if is_combos_store(combos):
+        set_combos_store_color_identities(combos, cards)
 
     # output format
     outformat = 'html' if args.html else 'console'
@@ -7238,6 +8828,9 @@ def main():
 
     # HTML specifics
     if args.html:
+        if args.prefetch_images:
+            HTML_IMAGES_DIR = args.outdir or get_cache_dir('images')
+
         def colored(text, color, *pos, **kwargs):  # pylint: disable=unused-variable,unused-argument,redefined-outer-name
             """Return the text colored"""
             return '<span class="'+color+'">'+text+'</span>'
@@ -7261,7 +8854,8 @@ def main():
     display_deck_building_header(outformat = outformat)
 
     commander_combos_no_filter = get_combos(combos, cards, name = COMMANDER_NAME, only_ok = False)
-    commander_combos = get_combos(combos, cards_ok, name = COMMANDER_NAME)
+    commander_combos = get_combos(combos, cards_ok, name = COMMANDER_NAME,
+                                  color_identity = COMMANDER_COLOR_IDENTITY)
 
     combos_rank_1, cards_rank_1, combos_rank_2, cards_rank_2 = assist_commander_combos(
             commander_combos_no_filter, commander_combos, commander_combos_regex, combos, cards_ok,
@@ -7676,6 +9270,19 @@ def main():
         print('Cards selected:', len(cards_selection))
         print('')
 
+    # once the cards shown are known, the HTML output being only read after the run
+    if args.prefetch_images:
+        # the self-improving creatures selection adds its features names, not cards
+        prefetch_cards_images([commander_card]
+                              + [card for card in cards_selection if isinstance(card, dict)]
+                              + list(HTML_IMAGES_CARDS.values()), imgformat = 'normal',
+                              outdir = args.outdir)
+
+    if args.regex_stats:
+        print_regex_stats()
+
+    cache_evict()
+
 if __name__ == '__main__':
     try:
         main()
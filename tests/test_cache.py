@@ -0,0 +1,62 @@
+"""Tests of the cache eviction, in a temporary cache directory"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_builder_assistant as dba  # pylint: disable=wrong-import-position
+
+
+class CacheEvictTest(unittest.TestCase):
+    """Eviction of the least recently used groups of cache files"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_settings = (dba.CACHE_DIR, set(dba.CACHE_FILES_IN_USE))
+        dba.CACHE_DIR = self.cache_dir
+        dba.CACHE_FILES_IN_USE.clear()
+
+    def tearDown(self):
+        dba.CACHE_DIR = self.cache_settings[0]
+        dba.CACHE_FILES_IN_USE.clear()
+        dba.CACHE_FILES_IN_USE.update(self.cache_settings[1])
+        shutil.rmtree(self.cache_dir)
+
+    def make_file(self, namespace, name, size, atime):
+        """Create a cache file of that size, last accessed at that time, and return its path"""
+        file_path = os.path.join(dba.get_cache_dir(namespace), name)
+        with open(file_path, 'wb') as f_write:
+            f_write.write(b'x' * size)
+        os.utime(file_path, (atime, atime))
+        return file_path
+
+    def test_sidecars_evicted_with_their_data_file(self):
+        """The sync state of the combos is only evicted with the combos, even when older than
+           the other files"""
+        meta = self.make_file('commanderspellbook', 'combos-2024-01.meta.json', 10, 1000)
+        combos = self.make_file('commanderspellbook', 'combos-2024-01.json', 100, 3000)
+        image = self.make_file('images', 'Card--normal.jpg', 100, 2000)
+        dba.cache_evict(150)
+        self.assertFalse(os.path.exists(image))
+        self.assertTrue(os.path.exists(meta))
+        self.assertTrue(os.path.exists(combos))
+        dba.cache_evict(50)
+        self.assertFalse(os.path.exists(meta))
+        self.assertFalse(os.path.exists(combos))
+
+    def test_group_in_use_kept(self):
+        """A group with a file used by the current run is not evicted"""
+        cards = self.make_file('scryfall', 'oracle-cards.json.gz', 100, 1000)
+        validators = self.make_file('scryfall', 'oracle-cards.json.gz.validators.json', 10, 1000)
+        dba.cache_touch(cards)
+        dba.cache_evict(0)
+        self.assertTrue(os.path.exists(cards))
+        self.assertTrue(os.path.exists(validators))
+
+
+if __name__ == '__main__':
+    unittest.main()
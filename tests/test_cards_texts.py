@@ -0,0 +1,89 @@
+"""Tests of the cards texts seen by the matchers (stripped texts) and of the categories tags,
+   against real cards oracle texts"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_builder_assistant as dba  # pylint: disable=wrong-import-position
+
+CARDS = {
+    'Smothering Tithe': (
+        'Enchantment',
+        "Whenever an opponent draws a card, that player may pay {2}. If the player doesn't, "
+        "you create a Treasure token. (It's an artifact with \"{T}, Sacrifice this artifact: "
+        "Add one mana of any color.\")"),
+    'Dockside Extortionist': (
+        'Creature — Goblin Pirate',
+        "When Dockside Extortionist enters the battlefield, create X Treasure tokens, where X is "
+        "the number of artifacts and enchantments your opponents control. (Treasure tokens are "
+        "artifacts with \"{T}, Sacrifice this artifact: Add one mana of any color.\")"),
+    'Tireless Tracker': (
+        'Creature — Human Scout',
+        "Landfall — Whenever a land enters the battlefield under your control, investigate. "
+        "(Create a Clue token. It's an artifact with \"{2}, Sacrifice this artifact: Draw a "
+        "card.\")\nWhenever you sacrifice a Clue, put a +1/+1 counter on Tireless Tracker."),
+    'Think Twice': (
+        'Instant',
+        "Draw a card.\nFlashback {2}{U} (You may cast this card from your graveyard for its "
+        "flashback cost. Then exile it.)"),
+    'Darksteel Ingot': (
+        'Artifact',
+        "Indestructible (Effects that say \"destroy\" don't destroy this artifact.)\n"
+        "{T}: Add one mana of any color."),
+}
+
+
+def get_card(name):
+    """Return the card of that name, like the Scryfall cards database holds it"""
+    type_line, oracle_text = CARDS[name]
+    return {'name': name, 'type_line': type_line, 'oracle_text': oracle_text}
+
+
+class TestCardsTexts(unittest.TestCase):
+    """Stripped texts and tags of real cards"""
+
+    def test_treasure_and_clue_reminders_kept(self):
+        """The Treasure and Clue reminder texts describe the card's effect, so they are kept"""
+        for name in ['Smothering Tithe', 'Dockside Extortionist', 'Tireless Tracker']:
+            card = get_card(name)
+            self.assertEqual(dba.get_stripped_oracle_texts(card), [card['oracle_text']])
+
+    def test_misleading_reminders_stripped(self):
+        """The reminder texts that would be taken for effects are removed"""
+        self.assertEqual(dba.get_stripped_oracle_texts(get_card('Think Twice')),
+                         ['Draw a card.\nFlashback {2}{U} '])
+        self.assertEqual(dba.get_stripped_oracle_texts(get_card('Darksteel Ingot')),
+                         ['Indestructible \n{T}: Add one mana of any color.'])
+
+    def test_self_references_stripped(self):
+        """Exiling the card itself is not taken for an effect on other cards"""
+        card = {'name': 'Test Card', 'type_line': 'Creature',
+                'oracle_text': "At the beginning of your upkeep, exile target creature.\n"
+                               "{1}: Exile Test Card."}
+        self.assertEqual(dba.get_stripped_oracle_texts(card),
+                         ['At the beginning of your upkeep, exile target creature.\n{1}: .'])
+
+    def test_tags(self):
+        """The ramp and draw cards creating Treasure or Clue tokens are tagged as such"""
+        self.assertTrue({'ramp', 'draw'} <= dba.get_card_tags(get_card('Smothering Tithe')))
+        self.assertIn('ramp', dba.get_card_tags(get_card('Dockside Extortionist')))
+        self.assertIn('draw', dba.get_card_tags(get_card('Tireless Tracker')))
+        self.assertIn('ramp', dba.get_card_tags(get_card('Darksteel Ingot')))
+        self.assertNotIn('removal', dba.get_card_tags(get_card('Darksteel Ingot')))
+
+    def test_tutor_joined_texts_exclude(self):
+        """The tutors matched on the joined texts are excluded on the faces texts"""
+        oracle_text = ("Search target opponent's library for up to three cards, exile them, "
+                       "then that player shuffles.\nDraw a card.")
+        card = {'name': 'Test Tutor', 'type_line': 'Sorcery', 'oracle_text': oracle_text}
+        self.assertIn('tutor', dba.get_card_tags(card))
+        card = {'name': 'Test Not Tutor', 'type_line': 'Sorcery',
+                'oracle_text': oracle_text+"\nSpells with the same name cost {1} more."}
+        self.assertNotIn('tutor', dba.get_card_tags(card))
+
+
+if __name__ == '__main__':
+    unittest.main()
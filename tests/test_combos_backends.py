@@ -0,0 +1,70 @@
+"""Tests of the combos backends: the SQLite combos database and the combos store return the
+   same combos for the same criteria"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_builder_assistant as dba  # pylint: disable=wrong-import-position
+
+COMBOS = {
+    '1': {'id': '1', 'r': 'Infinite mana. Infinite damage', 'c': ['Alpha // Beta', 'Gamma']},
+    '2': {'id': '2', 'r': 'Infinite damage', 'c': ['Alpha', 'Delta']},
+    '3': {'id': '3', 'r': 'Draws cards', 'c': ['Gamma', 'Delta', 'Epsilon']},
+    '4': {'id': '4', 'r': None, 'c': ['Beta', 'Epsilon']},
+    '5': {'id': '5', 'r': 'Infinite damage', 'c': ['Gamma', 'Epsilon']},
+}
+
+
+class CombosBackendsTest(unittest.TestCase):
+    """'query_commanderspellbook_combos_db()' against 'query_combos_store()'"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        db_file_path = os.path.join(self.outdir, 'combos.sqlite')
+        dba.build_commanderspellbook_combos_db(COMBOS, db_file_path)
+        self.conn = dba.sqlite3.connect(db_file_path)
+        self.conn.create_function('REGEXP', 2,
+                                  lambda regex, text: bool(text and dba.re.search(regex, text)))
+        self.conn.create_function('PY_LOWER', 1, lambda text: text.lower() if text else text)
+        self.store = dba.build_combos_store(COMBOS)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.outdir)
+
+    def assert_same_combos(self, expected_ids, **criteria):
+        """Both backends return the combos of these ids, with the same effects and cards"""
+        db_combos = dba.query_commanderspellbook_combos_db(self.conn, **criteria)
+        store_combos = dba.query_combos_store(self.store, **criteria)
+        self.assertEqual(sorted(db_combos), expected_ids)
+        self.assertEqual(sorted(store_combos), expected_ids)
+        for combo_id, combo in db_combos.items():
+            self.assertEqual(combo['r'], store_combos[combo_id]['r'])
+            self.assertEqual(sorted(combo['c']), sorted(store_combos[combo_id]['c']))
+
+    def test_name(self):
+        """The combos with a card whose name contains the name specified"""
+        self.assert_same_combos(['1', '2'], name = 'Alpha')
+        self.assert_same_combos(['1', '4'], name = 'Beta')
+        self.assert_same_combos([], name = 'Zeta')
+
+    def test_effect_regex(self):
+        """The regex is matched against the whole lowercased effect"""
+        self.assert_same_combos(['1'], combo_res_regex = 'mana.*damage')
+        self.assert_same_combos(['2', '5'], combo_res_regex = '^infinite damage$')
+
+    def test_criteria_combined(self):
+        """All the criteria specified are applied"""
+        self.assert_same_combos(['5'], name = 'Gamma', combo_res_regex = 'damage', excludes = ['1'])
+        self.assert_same_combos(['3'], min_cards = 3)
+        self.assert_same_combos(['2', '5'], available_names = {'Alpha', 'Gamma', 'Delta',
+                                                               'Epsilon'}, max_cards = 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Tests of the CommanderSpellbook combos sync, against a local stand-in of the variants API
+   serving paginated fixture data"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_builder_assistant as dba  # pylint: disable=wrong-import-position
+
+PAGE_SIZE = 2
+
+
+def variant(variant_id, updated, effect, cards, status = 'OK'):
+    """Return a CommanderSpellbook variant, like the API serves it"""
+    return {'id': variant_id, 'status': status, 'updated': updated,
+            'produces': [{'name': effect}],
+            'uses': [{'card': {'name': name}} for name in cards]}
+
+
+class VariantsHandler(BaseHTTPRequestHandler):
+    """Serve the variants of the server ('server.variants') by pages of 'PAGE_SIZE', ordered
+       by most recently updated first when asked with 'ordering=-updated'"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve a page of variants"""
+        url_parts = urlsplit(self.path)
+        query = dict(parse_qsl(url_parts.query))
+        self.server.requests.append(query)
+        variants = list(self.server.variants)
+        if query.get('ordering') == '-updated':
+            variants.sort(key = lambda v: v.get('updated', ''), reverse = True)
+        page = int(query.get('page', 1))
+        results = variants[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        next_url = None
+        if page * PAGE_SIZE < len(variants):
+            next_url = ('http://127.0.0.1:'+str(self.server.server_port)+url_parts.path+'?'
+                        +urlencode(query | {'page': page + 1}))
+        if self.server.without_updated:
+            results = [{k: v for k, v in r.items() if k != 'updated'} for r in results]
+        body = json.dumps({'count': len(variants), 'next': next_url,
+                           'results': results}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Stay quiet"""
+
+
+class CommanderSpellbookSyncTest(unittest.TestCase):
+    """Full crawl, incremental merge and fallback of 'get_commanderspellbook_combos()'"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), VariantsHandler)
+        self.server.variants = [
+            variant('1', '2024-01-01T00:00:00', 'Infinite mana', ['A', 'B']),
+            variant('2', '2024-01-02T00:00:00', 'Infinite draw', ['B', 'C']),
+            variant('3', '2024-01-03T00:00:00', 'Infinite damage', ['C', 'D']),
+            variant('4', '2024-01-04T00:00:00', 'Infinite tokens', ['D', 'E']),
+            variant('5', '2024-01-05T00:00:00', 'Broken', ['E', 'F'], status = 'NotWorking'),
+        ]
+        self.server.requests = []
+        self.server.without_updated = False
+        Thread(target = self.server.serve_forever, daemon = True).start()
+        self.api_url = 'http://127.0.0.1:'+str(self.server.server_port)+'/variants/?format=json'
+        self.outdir = tempfile.mkdtemp()
+        # nothing written to the real cache (e.g.: the storage codec benchmark)
+        self.cache_settings = (dba.CACHE_DIR, dba.STORAGE_CODEC)
+        dba.CACHE_DIR = self.outdir
+        dba.STORAGE_CODEC = 'none'
+        self.rate_limits = dict(dba.RATE_LIMITS)
+        dba.RATE_LIMITS['commanderspellbook'] = (1000, 1000)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        dba.RATE_LIMITS.update(self.rate_limits)
+        dba.CACHE_DIR, dba.STORAGE_CODEC = self.cache_settings
+        shutil.rmtree(self.outdir)
+
+    def get_combos(self, **kwargs):
+        """Return the combos synced from the stand-in server"""
+        return dba.get_commanderspellbook_combos(outdir = self.outdir, api_url = self.api_url,
+                                                 **kwargs)
+
+    def test_full_crawl(self):
+        """All the pages are fetched in order, and only the 'OK' variants are kept"""
+        combos = self.get_combos()
+        self.assertEqual(sorted(combos), ['1', '2', '3', '4'])
+        self.assertEqual(combos['2'], {'id': '2', 'r': 'Infinite draw', 'c': ['B', 'C']})
+        self.assertEqual([q.get('page', '1') for q in self.server.requests], ['1', '2', '3'])
+
+    def test_incremental_merge(self):
+        """Only the variants updated since the last sync are fetched and merged, the ones that
+           are no longer 'OK' being removed"""
+        self.get_combos()
+        self.server.requests.clear()
+        self.server.variants[0] = variant('1', '2024-02-01T00:00:00', 'Infinite life', ['A', 'B'])
+        self.server.variants[2] = variant('3', '2024-02-02T00:00:00', 'Infinite damage',
+                                          ['C', 'D'], status = 'NotWorking')
+        self.server.variants.append(variant('6', '2024-02-03T00:00:00', 'Infinite mill',
+                                            ['F', 'G']))
+
+        combos = self.get_combos(update = True)
+        self.assertEqual(sorted(combos), ['1', '2', '4', '6'])
+        self.assertEqual(combos['1']['r'], 'Infinite life')
+        self.assertEqual(combos['6']['c'], ['F', 'G'])
+        # the sync stopped at the first variant not updated since the last sync
+        self.assertTrue(all(q.get('ordering') == '-updated' for q in self.server.requests))
+        self.assertEqual([q.get('page', '1') for q in self.server.requests], ['1', '2'])
+
+    def test_fallback_to_full_crawl(self):
+        """Without the 'updated' key in the variants, a full crawl is done instead"""
+        self.get_combos()
+        self.server.requests.clear()
+        self.server.without_updated = True
+        del self.server.variants[1]
+
+        combos = self.get_combos(update = True)
+        self.assertEqual(sorted(combos), ['1', '3', '4'])
+        self.assertEqual(self.server.requests[0].get('ordering'), '-updated')
+        self.assertTrue(all('ordering' not in q for q in self.server.requests[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()